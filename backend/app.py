@@ -5,19 +5,30 @@ from fastapi.responses import StreamingResponse, Response, FileResponse, JSONRes
 import os
 import shutil
 import time
-import json
 import asyncio
 import httpx
+from http.cookiejar import CookieJar, DefaultCookiePolicy
 import uuid
 from typing import List, Optional
 
 from .gemini_service import GeminiService
+from . import fast_json
 from .storage import save_chat_message, get_workspace as get_workspace_data, add_workspace
 from .websocket_manager import ws_manager, MessageType
 from .routers import git_routes, workspace, chat, config
 
 app = FastAPI()
 
+
+def _ndjson_line(chunk: dict) -> bytes:
+    """Encode one streamed chunk as an NDJSON line."""
+    return fast_json.dumps_bytes(chunk) + b"\n"
+
+
+# 1x1 transparent PNG served when an image cannot be proxied
+_PLACEHOLDER_PNG = b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00\x1f\x15\xc4\x89\x00\x00\x00\nIDATx\x9cc\x00\x01\x00\x00\x05\x00\x01\r\n-\xb4\x00\x00\x00\x00IEND\xaeB`\x82'
+
+
 # Share service instances
 gemini_service = GeminiService()
 app.state.gemini_service = gemini_service
@@ -104,19 +115,12 @@ async def chat_endpoint(
         async def response_generator():
             try:
                 async for chunk in gemini_service.generate_response(message, session_id, files=file_paths):
-                    if "error" in chunk:
-                        yield json.dumps(chunk) + "\n"
-                    elif "tool_call" in chunk:
-                        yield json.dumps(chunk) + "\n"
-                    elif "tool_result" in chunk:
-                        yield json.dumps(chunk) + "\n"
-                    else:
-                        if chunk.get("images"):
-                            chunk["images"] = [f"/proxy_image?url={url}" for url in chunk["images"]]
-                        yield json.dumps(chunk) + "\n"
+                    if chunk.get("images"):
+                        chunk["images"] = [f"/proxy_image?url={url}" for url in chunk["images"]]
+                    yield _ndjson_line(chunk)
             except Exception as e:
                 print(f"Error in streaming: {e}")
-                yield json.dumps({"text": f"\n\n**STREAM ERROR:** {str(e)}", "is_final": True}) + "\n"
+                yield _ndjson_line({"text": f"\n\n**STREAM ERROR:** {str(e)}", "is_final": True})
             finally:
                 for path in file_paths:
                     try: os.remove(path)
@@ -127,67 +131,89 @@ async def chat_endpoint(
         print(f"Error in chat endpoint: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# One pooled client for image proxying, so repeated fetches from Google's image
+# hosts reuse open connections instead of a new TLS handshake per image.
+# Its jar rejects every cookie, so Set-Cookie from one proxied URL is never
+# replayed on another; auth cookies are sent per request as a header instead.
+_image_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_image_client() -> httpx.AsyncClient:
+    global _image_client
+    if _image_client is None or _image_client.is_closed:
+        _image_client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=30.0,
+            cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=300)
+        )
+    return _image_client
+
+
+@app.on_event("shutdown")
+async def close_image_client():
+    if _image_client is not None:
+        await _image_client.aclose()
+
+
 @app.get("/proxy_image")
 async def proxy_image(url: str):
     """Proxy external images to avoid CORS issues with Google's generated images."""
     import traceback
     
-    async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
+    client = _get_image_client()
+    try:
+        # Add headers that help with Google's image servers
+        headers = {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            "Accept": "image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8",
+            "Accept-Language": "en-US,en;q=0.9",
+            "Referer": "https://gemini.google.com/",
+            "Origin": "https://gemini.google.com",
+            "Sec-Fetch-Dest": "image",
+            "Sec-Fetch-Mode": "no-cors",
+            "Sec-Fetch-Site": "cross-site"
+        }
+        
+        # Try to get cookies from gemini_service if available
         try:
-            # Add headers that help with Google's image servers
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                "Accept": "image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8",
-                "Accept-Language": "en-US,en;q=0.9",
-                "Referer": "https://gemini.google.com/",
-                "Origin": "https://gemini.google.com",
-                "Sec-Fetch-Dest": "image",
-                "Sec-Fetch-Mode": "no-cors",
-                "Sec-Fetch-Site": "cross-site"
+            from .config import load_config
+            config = load_config()
+            cookies = {}
+            if config.get("Secure_1PSID"):
+                cookies["__Secure-1PSID"] = config.get("Secure_1PSID")
+            if config.get("Secure_1PSIDTS"):
+                cookies["__Secure-1PSIDTS"] = config.get("Secure_1PSIDTS")
+            if config.get("Secure_1PSIDCC"):
+                cookies["__Secure-1PSIDCC"] = config.get("Secure_1PSIDCC")
+            if cookies:
+                headers["Cookie"] = "; ".join(f"{name}={value}" for name, value in cookies.items())
+            resp = await client.get(url, headers=headers)
+        except Exception:
+            resp = await client.get(url, headers=headers)
+        
+        if resp.status_code != 200:
+            print(f"[proxy_image] Failed to fetch {url[:100]}... Status: {resp.status_code}")
+            # Return a placeholder image instead of an error
+            return Response(content=_PLACEHOLDER_PNG, media_type="image/png")
+        
+        content_type = resp.headers.get("Content-Type", "image/png")
+        return Response(
+            content=resp.content, 
+            media_type=content_type,
+            headers={
+                "Cache-Control": "public, max-age=86400",
+                "Access-Control-Allow-Origin": "*"
             }
-            
-            # Try to get cookies from gemini_service if available
-            try:
-                from .config import load_config
-                config = load_config()
-                cookies = {}
-                if config.get("Secure_1PSID"):
-                    cookies["__Secure-1PSID"] = config.get("Secure_1PSID")
-                if config.get("Secure_1PSIDTS"):
-                    cookies["__Secure-1PSIDTS"] = config.get("Secure_1PSIDTS")
-                if config.get("Secure_1PSIDCC"):
-                    cookies["__Secure-1PSIDCC"] = config.get("Secure_1PSIDCC")
-                if cookies:
-                    resp = await client.get(url, headers=headers, cookies=cookies)
-                else:
-                    resp = await client.get(url, headers=headers)
-            except Exception:
-                resp = await client.get(url, headers=headers)
-            
-            if resp.status_code != 200:
-                print(f"[proxy_image] Failed to fetch {url[:100]}... Status: {resp.status_code}")
-                # Return a placeholder image instead of an error
-                placeholder = b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00\x1f\x15\xc4\x89\x00\x00\x00\nIDATx\x9cc\x00\x01\x00\x00\x05\x00\x01\r\n-\xb4\x00\x00\x00\x00IEND\xaeB`\x82'
-                return Response(content=placeholder, media_type="image/png")
-            
-            content_type = resp.headers.get("Content-Type", "image/png")
-            return Response(
-                content=resp.content, 
-                media_type=content_type,
-                headers={
-                    "Cache-Control": "public, max-age=86400",
-                    "Access-Control-Allow-Origin": "*"
-                }
-            )
-        except httpx.TimeoutException:
-            print(f"[proxy_image] Timeout fetching: {url[:100]}...")
-            raise HTTPException(status_code=504, detail="Image fetch timed out")
-        except Exception as e:
-            print(f"[proxy_image] Error fetching {url[:100]}...: {e}")
-            traceback.print_exc()
-            # Return a placeholder instead of error
-            placeholder = b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00\x1f\x15\xc4\x89\x00\x00\x00\nIDATx\x9cc\x00\x01\x00\x00\x05\x00\x01\r\n-\xb4\x00\x00\x00\x00IEND\xaeB`\x82'
-            return Response(content=placeholder, media_type="image/png")
+        )
+    except httpx.TimeoutException:
+        print(f"[proxy_image] Timeout fetching: {url[:100]}...")
+        raise HTTPException(status_code=504, detail="Image fetch timed out")
+    except Exception as e:
+        print(f"[proxy_image] Error fetching {url[:100]}...: {e}")
+        traceback.print_exc()
+        # Return a placeholder instead of error
+        return Response(content=_PLACEHOLDER_PNG, media_type="image/png")
 
 # --- WebSocket ---
 
@@ -220,19 +246,20 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                 await ws_manager.send_to_connection(connection_id, MessageType.PONG, {"timestamp": time.time()})
             
             elif msg_type == "subscribe_terminal":
-                if data.get("terminal_id"): ws_manager.subscribe_to_terminal(connection_id, data.get("terminal_id"))
+                if terminal_id := data.get("terminal_id"): ws_manager.subscribe_to_terminal(connection_id, terminal_id)
             
             elif msg_type == "terminal_input":
-                if data.get("terminal_id"): await ws_manager.send_terminal_input(data.get("terminal_id"), data.get("input", ""))
+                if terminal_id := data.get("terminal_id"): await ws_manager.send_terminal_input(terminal_id, data.get("input", ""))
             
             elif msg_type == "run_command":
                 terminal_id = data.get("terminal_id") or f"term_{uuid.uuid4().hex[:8]}"
+                command = data.get("command")
                 ws_manager.subscribe_to_terminal(connection_id, terminal_id)
-                asyncio.create_task(ws_manager.run_streaming_command(data.get("command", ""), terminal_id, data.get("cwd")))
-                await ws_manager.send_to_connection(connection_id, MessageType.TERMINAL_OUTPUT, {"terminal_id": terminal_id, "output": f"$ {data.get('command')}\n", "is_error": False})
+                asyncio.create_task(ws_manager.run_streaming_command(command or "", terminal_id, data.get("cwd")))
+                await ws_manager.send_to_connection(connection_id, MessageType.TERMINAL_OUTPUT, {"terminal_id": terminal_id, "output": f"$ {command}\n", "is_error": False})
             
             elif msg_type == "kill_terminal":
-                if data.get("terminal_id"): await ws_manager.kill_terminal(data.get("terminal_id"))
+                if terminal_id := data.get("terminal_id"): ws_manager.kill_terminal(terminal_id)
 
     except WebSocketDisconnect:
         await ws_manager.disconnect(connection_id)
@@ -262,19 +289,21 @@ async def handle_ws_chat(connection_id: str, session_id: str, message: str, work
                         file_paths.append(fpath)
             
             async for chunk in gemini_service.generate_response(message, session_id, files=file_paths):
-                if "error" in chunk:
-                    await ws_manager.send_to_session(session_id, MessageType.ERROR, {"message": chunk["error"]})
-                elif "thought" in chunk:
+                # A chunk may carry several keys (e.g. thought + text + tool_call);
+                # forward each in the order the UI renders them
+                if "thought" in chunk:
                     await ws_manager.send_to_session(session_id, MessageType.THOUGHT, {"content": chunk["thought"]})
-                elif "tool_call" in chunk:
-                    await ws_manager.send_to_session(session_id, MessageType.TOOL_CALL, {"name": chunk["tool_call"]["name"], "args": chunk["tool_call"]["args"]})
-                elif "tool_result" in chunk:
-                    await ws_manager.send_to_session(session_id, MessageType.TOOL_RESULT, {"content": chunk["tool_result"]})
-                else:
+                if "text" in chunk or "images" in chunk or (chunk.get("is_final") and "error" not in chunk):
                     # Proxy images through our server to avoid CORS issues
                     images = chunk.get("images", [])
                     proxied_images = [f"/proxy_image?url={url}" for url in images] if images else []
                     await ws_manager.send_to_session(session_id, MessageType.TEXT, {"content": chunk.get("text", ""), "images": proxied_images, "is_final": chunk.get("is_final", False)})
+                if "tool_call" in chunk:
+                    await ws_manager.send_to_session(session_id, MessageType.TOOL_CALL, {"name": chunk["tool_call"]["name"], "args": chunk["tool_call"]["args"]})
+                if "tool_result" in chunk:
+                    await ws_manager.send_to_session(session_id, MessageType.TOOL_RESULT, {"content": chunk["tool_result"]})
+                if "error" in chunk:
+                    await ws_manager.send_to_session(session_id, MessageType.ERROR, {"message": chunk["error"]})
                     
         except asyncio.CancelledError:
             await ws_manager.send_to_session(session_id, MessageType.TEXT, {"content": "\n\n*Cancelled.*", "is_final": True})
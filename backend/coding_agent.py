@@ -11,22 +11,73 @@ Features:
 """
 
 import re
+import sys
 import json
 import asyncio
-from typing import Optional, Dict, Any, List, Tuple
+from functools import lru_cache
+from typing import Optional, Dict, Any, FrozenSet, List, Pattern, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 
 from .tools import Tools
+from .config import load_config
+from . import fast_json
+from .response_filter import strip_matches
 from .coding_prompts import (
     get_system_prompt,
     get_tool_result_template,
     get_error_recovery_hint,
-    build_workspace_context,
-    TOOL_SCHEMAS
+    build_workspace_context
 )
 
 
+# Tool-call JSON left in model output, stripped before text is shown to the user
+TOOL_JSON_BLOCK_RE = re.compile(
+    r'```json\s*\{[^`]*?"(?:action|tool|name)"\s*:[^`]*?\}\s*```',
+    re.DOTALL
+)
+STANDALONE_TOOL_JSON_RE = re.compile(
+    r'(?<![`\w])\{\s*"(?:action|tool)"\s*:\s*"[^"]+"\s*,\s*"args"\s*:\s*\{[^}]*\}\s*\}(?![`\w])'
+)
+
+# Tool call parsing patterns (ordered by priority)
+_JSON_BLOCK_RE = re.compile(r'```json\s*(\{[\s\S]*?\})\s*```', re.MULTILINE)
+_INLINE_ACTION_RE = re.compile(r'\{\s*"action"\s*:\s*"([^"]+)"')
+
+
+# Substrings that mark a tool result as failed, matched in a single pass
+_ERROR_MARKERS = (
+    "error:",
+    "error ",
+    "failed",
+    "not found",
+    "permission denied",
+    "invalid",
+    "exception",
+    "traceback"
+)
+_ERROR_MARKER_RE = re.compile("|".join(map(re.escape, _ERROR_MARKERS)), re.IGNORECASE)
+
+# Patterns used while parsing and cleaning model output
+_TRAILING_COMMA_RE = re.compile(r',\s*([}\]])')
+_FUNCTION_ARG_RE = re.compile(r'(\w+)\s*=\s*(["\']?)([^,"\']*)(["\']?)')
+_GOOGLE_CONTENT_URL_RE = re.compile(r'https?://googleusercontent\.com/youtube_content/\d+')
+_EXCESS_NEWLINES_RE = re.compile(r'\n{3,}')
+
+# Thinking blocks embedded in model output, used by separate_thinking
+_THINK_TAG_RE = re.compile(r'<think>(.*?)</think>', re.DOTALL | re.IGNORECASE)
+_THINKING_BRACKET_RE = re.compile(r'\[Thinking\](.*?)\[/Thinking\]', re.DOTALL | re.IGNORECASE)
+_THINKING_HEADER_RE = re.compile(r'\*\*Thinking:\*\*\s*(.*?)(?=\*\*[A-Z]|\n\n|$)', re.DOTALL)
+
+
+@lru_cache(maxsize=8)
+def _function_call_pattern(tool_names: FrozenSet[str]) -> Pattern:
+    """Regex for `tool_name(...)` style calls to any of the given tools."""
+    # Longest names first so e.g. read_files wins over read_file
+    names = sorted(tool_names, key=len, reverse=True)
+    return re.compile(rf'({"|".join(map(re.escape, names))})\s*\(\s*([^)]*)\s*\)')
+
+
 class ToolCallStatus(Enum):
     """Status of a tool call execution."""
     SUCCESS = "success"
@@ -35,7 +86,19 @@ class ToolCallStatus(Enum):
     SKIP = "skip"
 
 
-@dataclass
+# Tool summary line prefix per status: success gets a check, anything else a cross
+_SUMMARY_PREFIX = {
+    status: "  ✓ " if status is ToolCallStatus.SUCCESS else "  ✗ "
+    for status in ToolCallStatus
+}
+
+
+# One ToolExecution is kept per tool call for the whole session, so drop the
+# per-instance __dict__ where dataclasses support it (Python 3.10+)
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_SLOTS)
 class ToolExecution:
     """Represents a tool execution with its result."""
     tool_name: str
@@ -44,6 +107,11 @@ class ToolExecution:
     status: ToolCallStatus
     retry_count: int = 0
     error_hint: Optional[str] = None
+    # Line used in AgentContext.get_tool_summary, rendered once per execution
+    summary_line: str = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.summary_line = _SUMMARY_PREFIX[self.status] + self.tool_name
 
 
 @dataclass
@@ -56,9 +124,12 @@ class AgentContext:
     tool_history: List[ToolExecution] = field(default_factory=list)
     file_cache: Dict[str, str] = field(default_factory=dict)
     recent_errors: List[str] = field(default_factory=list)
+    # Rendered workspace context for the system prompt; cleared on new activity
+    _prompt_context: Optional[str] = field(default=None, init=False, repr=False)
 
     def add_tool_execution(self, execution: ToolExecution):
         """Track tool execution."""
+        self._prompt_context = None
         self.tool_history.append(execution)
         if execution.status == ToolCallStatus.ERROR:
             self.recent_errors.append(f"{execution.tool_name}: {execution.result[:200]}")
@@ -70,13 +141,26 @@ class AgentContext:
         if not self.tool_history:
             return "No tools executed yet."
 
-        recent = self.tool_history[-5:]
         lines = ["Recent tool executions:"]
-        for exec in recent:
-            status_icon = "✓" if exec.status == ToolCallStatus.SUCCESS else "✗"
-            lines.append(f"  {status_icon} {exec.tool_name}")
+        lines.extend(execution.summary_line for execution in self.tool_history[-5:])
         return "\n".join(lines)
 
+    def get_prompt_context(self) -> str:
+        """
+        Workspace context section for the system prompt.
+
+        Built from the tool summary and recent errors, and reused until the
+        next tool execution changes either of them.
+        """
+        if self._prompt_context is None:
+            context = self.get_tool_summary() if self.tool_history else ""
+            if self.recent_errors:
+                context += "\n\n### Recent Errors (address these):\n" + "".join(
+                    f"- {err}\n" for err in self.recent_errors[-3:]
+                )
+            self._prompt_context = context
+        return self._prompt_context
+
 
 class CodingAgent:
     """
@@ -89,6 +173,11 @@ class CodingAgent:
     - Structured output for streaming
     """
 
+    __slots__ = (
+        "tools", "conversation_history", "session_id", "context",
+        "_valid_tools",
+    )
+
     def __init__(self, workspace_path: str = None, session_id: str = None):
         self.tools = Tools(workspace_path, session_id=session_id)
         self.conversation_history: List[Dict[str, Any]] = []
@@ -101,14 +190,10 @@ class CodingAgent:
             max_iterations=20
         )
 
-        # Tool call parsing patterns (ordered by priority)
-        self._json_block_pattern = re.compile(
-            r'```json\s*(\{[\s\S]*?\})\s*```',
-            re.MULTILINE
-        )
-        self._inline_action_pattern = re.compile(
-            r'\{\s*"action"\s*:\s*"([^"]+)"'
-        )
+        # Tool names accepted by parse_tool_call; the catalogue is fixed per agent
+        self._valid_tools: FrozenSet[str] = frozenset(
+            t['name'] for t in self.tools.get_available_tools()
+        ) | {"delegate_task"}
 
     def set_workspace(self, path: str) -> str:
         """Set the agent's workspace."""
@@ -118,22 +203,12 @@ class CodingAgent:
 
     def get_system_prompt(self) -> str:
         """Get the system prompt with current workspace context."""
-        # Build context from recent activity
-        workspace_context = ""
-
-        # Add tool execution summary if we have history
-        if self.context.tool_history:
-            workspace_context = self.context.get_tool_summary()
-
-        # Add error context if we've had recent errors
-        if self.context.recent_errors:
-            workspace_context += "\n\n### Recent Errors (address these):\n"
-            for err in self.context.recent_errors[-3:]:
-                workspace_context += f"- {err}\n"
-
+        # The context string is cached on AgentContext and the rendered prompt
+        # is cached per (path, context), so an unchanged session is two lookups
         return get_system_prompt(
             workspace_path=self.tools.workspace_path,
-            workspace_context=workspace_context
+            workspace_context=self.context.get_prompt_context(),
+            compact=bool(load_config().get("compact_system_prompt", False))
         )
 
     def parse_tool_call(self, text: str) -> Optional[Dict[str, Any]]:
@@ -145,29 +220,25 @@ class CodingAgent:
         2. Inline JSON with "action" key
         3. Fallback patterns for edge cases
 
-        Returns dict with: name, args, raw_match
+        Returns dict with: name, args, raw_match, and span, the (start, end)
+        of raw_match in `text` so callers can cut it out without searching.
         """
         if not text:
             return None
 
         # Get valid tool names
-        valid_tools = {t['name'] for t in self.tools.get_available_tools()}
-        valid_tools.add("delegate_task")
+        valid_tools = self._valid_tools
 
         # Strategy 1: JSON code blocks (most reliable)
-        json_blocks = self._json_block_pattern.findall(text)
-        for block in json_blocks:
-            result = self._try_parse_json(block, valid_tools)
+        for match in _JSON_BLOCK_RE.finditer(text):
+            result = self._try_parse_json(match.group(1), valid_tools)
             if result:
-                # Find the full match for raw_match
-                full_match = f"```json\n{block}\n```"
-                if full_match not in text:
-                    full_match = f"```json{block}```"
-                result["raw_match"] = full_match
+                result["raw_match"] = match.group(0)
+                result["span"] = match.span()
                 return result
 
         # Strategy 2: Find inline JSON with action key
-        for match in self._inline_action_pattern.finditer(text):
+        for match in _INLINE_ACTION_RE.finditer(text):
             tool_name = match.group(1)
             if tool_name not in valid_tools:
                 continue
@@ -178,36 +249,34 @@ class CodingAgent:
                 result = self._try_parse_json(json_str, valid_tools)
                 if result:
                     result["raw_match"] = json_str
+                    result["span"] = (match.start(), match.start() + len(json_str))
                     return result
 
         # Strategy 3: Look for tool-like patterns without proper JSON
         # This handles edge cases where the model outputs malformed JSON
-        for tool_name in valid_tools:
-            pattern = rf'{tool_name}\s*\(\s*([^)]*)\s*\)'
-            match = re.search(pattern, text)
-            if match:
-                # Try to parse function-call style
-                args_str = match.group(1)
-                args = self._parse_function_args(args_str)
-                if args is not None:
-                    return {
-                        "name": tool_name,
-                        "args": args,
-                        "raw_match": match.group(0)
-                    }
+        for match in _function_call_pattern(valid_tools).finditer(text):
+            # Try to parse function-call style
+            tool_name, args_str = match.group(1), match.group(2)
+            args = self._parse_function_args(args_str)
+            if args is not None:
+                return {
+                    "name": tool_name,
+                    "args": args,
+                    "raw_match": match.group(0),
+                    "span": match.span()
+                }
 
         return None
 
-    def _try_parse_json(self, json_str: str, valid_tools: set) -> Optional[Dict[str, Any]]:
+    def _try_parse_json(self, json_str: str, valid_tools: FrozenSet[str]) -> Optional[Dict[str, Any]]:
         """Try to parse JSON and validate as tool call."""
         try:
             # Clean up common issues
             json_str = json_str.strip()
             # Handle trailing commas (common LLM mistake)
-            json_str = re.sub(r',\s*}', '}', json_str)
-            json_str = re.sub(r',\s*]', ']', json_str)
+            json_str = _TRAILING_COMMA_RE.sub(r'\1', json_str)
 
-            data = json.loads(json_str)
+            data = fast_json.loads(json_str)
 
             if not isinstance(data, dict):
                 return None
@@ -288,7 +357,7 @@ class CodingAgent:
             # Try to parse as key=value pairs
             args = {}
             # Simple pattern: key=value or key="value"
-            for match in re.finditer(r'(\w+)\s*=\s*(["\']?)([^,"\']*)(["\']?)', args_str):
+            for match in _FUNCTION_ARG_RE.finditer(args_str):
                 key = match.group(1)
                 value = match.group(3)
                 args[key] = value
@@ -330,18 +399,15 @@ class CodingAgent:
                 )
                 self.context.add_tool_execution(execution)
 
-                # Format result
+                # Format result, with a recovery hint if it failed
+                success = status == ToolCallStatus.SUCCESS
                 formatted = get_tool_result_template(
                     tool_name=tool_name,
                     output=result,
-                    success=(status == ToolCallStatus.SUCCESS)
+                    success=success,
+                    hint="" if success else get_error_recovery_hint(result)
                 )
 
-                # Add recovery hint if error
-                if status == ToolCallStatus.ERROR:
-                    hint = get_error_recovery_hint(result)
-                    formatted += f"\n{hint}"
-
                 return formatted, status
 
             except Exception as e:
@@ -372,24 +438,8 @@ class CodingAgent:
 
     def _determine_status(self, result: str) -> ToolCallStatus:
         """Determine if a tool execution was successful."""
-        result_lower = result.lower()
-
-        # Check for error indicators
-        error_patterns = [
-            "error:",
-            "error ",
-            "failed",
-            "not found",
-            "permission denied",
-            "invalid",
-            "exception",
-            "traceback"
-        ]
-
-        for pattern in error_patterns:
-            if pattern in result_lower:
-                return ToolCallStatus.ERROR
-
+        if _ERROR_MARKER_RE.search(result):
+            return ToolCallStatus.ERROR
         return ToolCallStatus.SUCCESS
 
     def _handle_delegation(self, args: Dict[str, Any]) -> str:
@@ -443,19 +493,18 @@ The main agent loop will handle this delegation by spawning a sub-agent."""
                 cleaned = cleaned.replace(match, "")
 
         # Remove orphaned JSON blocks that look like tool calls
-        json_block_pattern = r'```json\s*\{[^`]*?"(?:action|tool|name)"\s*:[^`]*?\}\s*```'
-        cleaned = re.sub(json_block_pattern, '', cleaned, flags=re.DOTALL)
+        if "```" in cleaned:
+            cleaned = TOOL_JSON_BLOCK_RE.sub('', cleaned)
 
         # Remove standalone JSON objects that look like tool calls
-        standalone_pattern = r'(?<![`\w])\{\s*"(?:action|tool)"\s*:\s*"[^"]+"\s*,\s*"args"\s*:\s*\{[^}]*\}\s*\}(?![`\w])'
-        cleaned = re.sub(standalone_pattern, '', cleaned)
+        if '"args"' in cleaned:
+            cleaned = STANDALONE_TOOL_JSON_RE.sub('', cleaned)
 
         # Remove Google content URLs (Gemini API artifact)
-        google_pattern = r'https?://googleusercontent\.com/youtube_content/\d+'
-        cleaned = re.sub(google_pattern, '', cleaned)
+        cleaned = _GOOGLE_CONTENT_URL_RE.sub('', cleaned)
 
         # Clean up excessive whitespace
-        cleaned = re.sub(r'\n{3,}', '\n\n', cleaned)
+        cleaned = _EXCESS_NEWLINES_RE.sub('\n\n', cleaned)
 
         return cleaned.strip()
 
@@ -470,24 +519,19 @@ The main agent loop will handle this delegation by spawning a sub-agent."""
 
         thinking_parts = []
         clean_text = text
+        lower = text.lower()
 
         # Pattern 1: <think>...</think>
-        think_matches = re.findall(r'<think>(.*?)</think>', text, re.DOTALL | re.IGNORECASE)
-        if think_matches:
-            thinking_parts.extend(think_matches)
-            clean_text = re.sub(r'<think>.*?</think>', '', clean_text, flags=re.DOTALL | re.IGNORECASE)
+        if "<think>" in lower:
+            clean_text = strip_matches(_THINK_TAG_RE, clean_text, thinking_parts)
 
         # Pattern 2: [Thinking]...[/Thinking]
-        bracket_matches = re.findall(r'\[Thinking\](.*?)\[/Thinking\]', clean_text, re.DOTALL | re.IGNORECASE)
-        if bracket_matches:
-            thinking_parts.extend(bracket_matches)
-            clean_text = re.sub(r'\[Thinking\].*?\[/Thinking\]', '', clean_text, flags=re.DOTALL | re.IGNORECASE)
+        if "[thinking]" in lower:
+            clean_text = strip_matches(_THINKING_BRACKET_RE, clean_text, thinking_parts)
 
         # Pattern 3: **Thinking:** ... (up to next section or double newline)
-        thinking_header = re.findall(r'\*\*Thinking:\*\*\s*(.*?)(?=\*\*[A-Z]|\n\n|$)', clean_text, re.DOTALL)
-        if thinking_header:
-            thinking_parts.extend(thinking_header)
-            clean_text = re.sub(r'\*\*Thinking:\*\*\s*.*?(?=\*\*[A-Z]|\n\n|$)', '', clean_text, flags=re.DOTALL)
+        if "**Thinking:**" in clean_text:
+            clean_text = strip_matches(_THINKING_HEADER_RE, clean_text, thinking_parts)
 
         thinking_content = '\n\n'.join(thinking_parts).strip() if thinking_parts else None
         return thinking_content, clean_text.strip()
@@ -515,23 +559,6 @@ The main agent loop will handle this delegation by spawning a sub-agent."""
             session_id=self.context.session_id
         )
 
-    def get_tool_descriptions(self) -> str:
-        """Get formatted tool descriptions for prompts."""
-        tools = self.tools.get_available_tools()
-        descriptions = []
-
-        for t in tools:
-            schema = TOOL_SCHEMAS.get(t['name'])
-            if schema:
-                # Use schema description if available
-                descriptions.append(f"- `{t['name']}`: {schema['description']}")
-            else:
-                descriptions.append(f"- `{t['name']}`: {t['description']}")
-
-        descriptions.append("- `delegate_task`: Delegate a complex sub-task to a specialized sub-agent. Args: task (str), context (str, optional)")
-
-        return "\n".join(descriptions)
-
     async def process_response(self, model_response: str) -> Dict[str, Any]:
         """
         Process model response, execute tools if needed.
@@ -11,596 +11,64 @@ Features:
 - Code quality and best practices guidance
 """
 
-from typing import Dict, Any, List
+import re
+import string
+from functools import lru_cache
+from typing import Dict, Any, List, NamedTuple, Optional, Pattern, Tuple
+
+from .flashy_base_prompt import TOOL_CALL_EXAMPLE, as_format_literal, check_placeholders
 
 
 # =============================================================================
-# TOOL SCHEMAS - Detailed tool definitions with types, examples, and constraints
+# TOOL SCHEMAS - Loaded from tool_schemas on first use
 # =============================================================================
 
-TOOL_SCHEMAS: Dict[str, Dict[str, Any]] = {
-    "read_file": {
-        "name": "read_file",
-        "description": "Read the contents of a single file. Use for understanding existing code before modifications.",
-        "parameters": {
-            "path": {
-                "type": "string",
-                "required": True,
-                "description": "Relative or absolute path to the file"
-            }
-        },
-        "returns": "File contents wrapped in code blocks, or error message",
-        "example": '{"action": "read_file", "args": {"path": "src/utils/helpers.py"}}',
-        "best_practices": [
-            "Always read a file before attempting to modify it",
-            "Check file existence before reading"
-        ]
-    },
-    "read_files": {
-        "name": "read_files",
-        "description": "Read multiple files in a single operation. Efficient for understanding related code.",
-        "parameters": {
-            "paths": {
-                "type": "array[string]",
-                "required": True,
-                "description": "List of file paths to read"
-            },
-            "max_bytes": {
-                "type": "integer",
-                "required": False,
-                "default": 200000,
-                "description": "Maximum bytes per file (truncates if exceeded)"
-            }
-        },
-        "returns": "Contents of all files, each wrapped in code blocks",
-        "example": '{"action": "read_files", "args": {"paths": ["src/index.js", "src/app.js"]}}',
-        "best_practices": [
-            "Use when you need to understand relationships between files",
-            "Limit to 5-10 files to avoid context overflow"
-        ]
-    },
-    "write_file": {
-        "name": "write_file",
-        "description": "Create a new file or completely overwrite an existing file. Creates parent directories automatically.",
-        "parameters": {
-            "path": {
-                "type": "string",
-                "required": True,
-                "description": "Path where the file will be written"
-            },
-            "content": {
-                "type": "string",
-                "required": True,
-                "description": "Complete file contents to write"
-            }
-        },
-        "returns": "Success message with character count, or error",
-        "example": '{"action": "write_file", "args": {"path": "src/new_module.py", "content": "def hello():\\n    return \\"Hello, World!\\""}}',
-        "best_practices": [
-            "Include complete, production-ready code",
-            "Add appropriate imports and type hints",
-            "Follow project conventions for formatting"
-        ]
-    },
-    "write_files": {
-        "name": "write_files",
-        "description": "Write multiple files in a single operation. Atomic and efficient.",
-        "parameters": {
-            "files": {
-                "type": "array[{path: string, content: string}]",
-                "required": True,
-                "description": "List of file objects with path and content"
-            }
-        },
-        "returns": "Status for each file written",
-        "example": '{"action": "write_files", "args": {"files": [{"path": "a.py", "content": "# File A"}, {"path": "b.py", "content": "# File B"}]}}',
-        "best_practices": [
-            "Use for creating related files together (e.g., module + tests)",
-            "Ensure all files are syntactically valid"
-        ]
-    },
-    "patch_file": {
-        "name": "patch_file",
-        "description": "Surgically replace a specific block of text in a file. Most efficient for targeted edits.",
-        "parameters": {
-            "path": {
-                "type": "string",
-                "required": True,
-                "description": "Path to the file to patch"
-            },
-            "target": {
-                "type": "string",
-                "required": True,
-                "description": "EXACT text to find and replace (including whitespace)"
-            },
-            "replacement": {
-                "type": "string",
-                "required": True,
-                "description": "New text to replace the target with"
-            }
-        },
-        "returns": "Success message or error if target not found",
-        "example": '{"action": "patch_file", "args": {"path": "main.py", "target": "def old_func():", "replacement": "def new_func():"}}',
-        "best_practices": [
-            "CRITICAL: Target must match EXACTLY, including indentation",
-            "Read the file first to get the exact text",
-            "Use for small, focused changes",
-            "For large changes, prefer write_file"
-        ]
-    },
-    "apply_patch": {
-        "name": "apply_patch",
-        "description": "Apply a unified diff patch to modify files. Useful for complex multi-file changes.",
-        "parameters": {
-            "patch": {
-                "type": "string",
-                "required": True,
-                "description": "Unified diff format patch content"
-            }
-        },
-        "returns": "Success message or detailed error",
-        "example": '{"action": "apply_patch", "args": {"patch": "--- a/file.py\\n+++ b/file.py\\n@@ -1,3 +1,3 @@\\n-old line\\n+new line"}}',
-        "best_practices": [
-            "Ensure diff format is correct (use --- a/ and +++ b/ prefixes)",
-            "Context lines help ensure correct placement"
-        ]
-    },
-    "list_dir": {
-        "name": "list_dir",
-        "description": "List files and directories in a path. Shows icons for type distinction.",
-        "parameters": {
-            "path": {
-                "type": "string",
-                "required": False,
-                "default": ".",
-                "description": "Directory path to list (default: current)"
-            }
-        },
-        "returns": "Formatted list with 📁 for dirs and 📄 for files",
-        "example": '{"action": "list_dir", "args": {"path": "src"}}',
-        "best_practices": [
-            "Use to explore project structure",
-            "Start with root to understand project layout"
-        ]
-    },
-    "get_file_tree": {
-        "name": "get_file_tree",
-        "description": "Get a recursive tree view of directory structure. Excellent for project overview.",
-        "parameters": {
-            "path": {
-                "type": "string",
-                "required": False,
-                "default": ".",
-                "description": "Root path for the tree"
-            },
-            "max_depth": {
-                "type": "integer",
-                "required": False,
-                "default": 2,
-                "description": "Maximum recursion depth"
-            }
-        },
-        "returns": "ASCII tree representation of directory structure",
-        "example": '{"action": "get_file_tree", "args": {"path": ".", "max_depth": 3}}',
-        "best_practices": [
-            "Use early in task to understand codebase",
-            "Increase max_depth for deeper exploration"
-        ]
-    },
-    "search_files": {
-        "name": "search_files",
-        "description": "Search for files matching a glob pattern. Finds files by name.",
-        "parameters": {
-            "pattern": {
-                "type": "string",
-                "required": True,
-                "description": "Glob pattern (e.g., '*.py', 'test_*.js')"
-            },
-            "path": {
-                "type": "string",
-                "required": False,
-                "default": ".",
-                "description": "Starting directory for search"
-            }
-        },
-        "returns": "List of matching file paths (capped at 50)",
-        "example": '{"action": "search_files", "args": {"pattern": "*.test.js", "path": "src"}}',
-        "best_practices": [
-            "Use specific patterns to limit results",
-            "Combine with read_file to examine matches"
-        ]
-    },
-    "grep_search": {
-        "name": "grep_search",
-        "description": "Search for text content inside files. Case-insensitive. Essential for finding code references.",
-        "parameters": {
-            "query": {
-                "type": "string",
-                "required": True,
-                "description": "Text or pattern to search for"
-            },
-            "path": {
-                "type": "string",
-                "required": False,
-                "default": ".",
-                "description": "Starting directory"
-            },
-            "extensions": {
-                "type": "array[string]",
-                "required": False,
-                "description": "Filter by file extensions (e.g., ['.py', '.js'])"
-            }
-        },
-        "returns": "Matching lines with file:line format (capped at 50)",
-        "example": '{"action": "grep_search", "args": {"query": "def calculate", "extensions": [".py"]}}',
-        "best_practices": [
-            "Use to find function/class definitions",
-            "Use to trace imports and dependencies",
-            "Limit with extensions for large codebases"
-        ]
-    },
-    "run_command": {
-        "name": "run_command",
-        "description": "Execute a shell command. Use for running tests, builds, installations, and any CLI operation.",
-        "parameters": {
-            "command": {
-                "type": "string",
-                "required": True,
-                "description": "Shell command to execute"
-            },
-            "cwd": {
-                "type": "string",
-                "required": False,
-                "description": "Working directory for the command"
-            }
-        },
-        "returns": "Command output with exit status",
-        "example": '{"action": "run_command", "args": {"command": "npm test"}}',
-        "best_practices": [
-            "Use for verification (tests, linting, type checking)",
-            "Check exit codes for success/failure",
-            "Break long pipelines into separate commands for clarity"
-        ],
-        "security_note": "Commands run with user privileges. Avoid dangerous operations."
-    },
-    "delete_path": {
-        "name": "delete_path",
-        "description": "Permanently delete a file or directory. Use with caution.",
-        "parameters": {
-            "path": {
-                "type": "string",
-                "required": True,
-                "description": "Path to delete"
-            }
-        },
-        "returns": "Success confirmation or error",
-        "example": '{"action": "delete_path", "args": {"path": "temp/old_file.txt"}}',
-        "best_practices": [
-            "Double-check path before deleting",
-            "Consider git status before deleting tracked files"
-        ]
-    },
-    "get_dependencies": {
-        "name": "get_dependencies",
-        "description": "Analyze project dependencies from package files (package.json, requirements.txt, etc.).",
-        "parameters": {},
-        "returns": "Contents of all found dependency files",
-        "example": '{"action": "get_dependencies", "args": {}}',
-        "best_practices": [
-            "Run early to understand project tech stack",
-            "Use to check for version conflicts"
-        ]
-    },
-    "get_symbol_info": {
-        "name": "get_symbol_info",
-        "description": "Find where a symbol (function, class, variable) is defined.",
-        "parameters": {
-            "symbol_name": {
-                "type": "string",
-                "required": True,
-                "description": "Name of the symbol to find"
-            }
-        },
-        "returns": "Definition locations found via grep",
-        "example": '{"action": "get_symbol_info", "args": {"symbol_name": "UserService"}}',
-        "best_practices": [
-            "Use to understand code before modifying",
-            "Check usages before renaming"
-        ]
-    },
-    "web_search": {
-        "name": "web_search",
-        "description": "Search the web for information using DuckDuckGo.",
-        "parameters": {
-            "query": {
-                "type": "string",
-                "required": True,
-                "description": "Search query"
-            }
-        },
-        "returns": "Top search results with titles, links, and snippets",
-        "example": '{"action": "web_search", "args": {"query": "python asyncio best practices 2025"}}',
-        "best_practices": [
-            "Use for documentation, error solutions, best practices",
-            "Be specific in queries for better results"
-        ]
-    },
-    "web_browse": {
-        "name": "web_browse",
-        "description": "Browse a specific URL and extract text content.",
-        "parameters": {
-            "url": {
-                "type": "string",
-                "required": True,
-                "description": "Full URL to browse"
-            }
-        },
-        "returns": "Page text content (capped at 10k chars)",
-        "example": '{"action": "web_browse", "args": {"url": "https://docs.python.org/3/library/asyncio.html"}}',
-        "best_practices": [
-            "Use to read documentation pages",
-            "Follow up on web_search results"
-        ]
-    },
-    "git_status": {
-        "name": "git_status",
-        "description": "Check current git repository status (changes, branch, etc.).",
-        "parameters": {},
-        "returns": "Git status output showing staged/unstaged changes",
-        "example": '{"action": "git_status", "args": {}}',
-        "best_practices": [
-            "Check before and after making changes",
-            "Verify what will be committed"
-        ]
-    },
-    "git_commit": {
-        "name": "git_commit",
-        "description": "Stage all changes and create a commit.",
-        "parameters": {
-            "message": {
-                "type": "string",
-                "required": True,
-                "description": "Commit message (follow conventional commits)"
-            }
-        },
-        "returns": "Commit confirmation or error",
-        "example": '{"action": "git_commit", "args": {"message": "feat: add user authentication module"}}',
-        "best_practices": [
-            "Use conventional commit format (type: description)",
-            "Make atomic commits (one logical change)",
-            "Verify changes with git_status first"
-        ]
-    },
-    "git_push": {
-        "name": "git_push",
-        "description": "Push local commits to remote repository.",
-        "parameters": {
-            "remote": {
-                "type": "string",
-                "required": False,
-                "default": "origin",
-                "description": "Remote name"
-            },
-            "branch": {
-                "type": "string",
-                "required": False,
-                "description": "Branch to push (default: current)"
-            }
-        },
-        "returns": "Push result or error",
-        "example": '{"action": "git_push", "args": {"remote": "origin", "branch": "feature/auth"}}',
-        "best_practices": [
-            "Ensure all tests pass before pushing",
-            "Create feature branches for new work"
-        ]
-    },
-    "git_pull": {
-        "name": "git_pull",
-        "description": "Pull latest changes from remote repository.",
-        "parameters": {
-            "remote": {
-                "type": "string",
-                "required": False,
-                "default": "origin",
-                "description": "Remote name"
-            },
-            "branch": {
-                "type": "string",
-                "required": False,
-                "description": "Branch to pull"
-            }
-        },
-        "returns": "Pull result showing changes",
-        "example": '{"action": "git_pull", "args": {}}',
-        "best_practices": [
-            "Pull before starting new work",
-            "Resolve conflicts carefully"
-        ]
-    },
-    "git_branches": {
-        "name": "git_branches",
-        "description": "List all local and remote branches.",
-        "parameters": {},
-        "returns": "Branch list with current branch marked",
-        "example": '{"action": "git_branches", "args": {}}',
-        "best_practices": [
-            "Check existing branches before creating new ones"
-        ]
-    },
-    "git_checkout": {
-        "name": "git_checkout",
-        "description": "Switch to a branch or create a new one.",
-        "parameters": {
-            "branch": {
-                "type": "string",
-                "required": True,
-                "description": "Branch name"
-            },
-            "create": {
-                "type": "boolean",
-                "required": False,
-                "default": False,
-                "description": "Create new branch if true"
-            }
-        },
-        "returns": "Checkout confirmation",
-        "example": '{"action": "git_checkout", "args": {"branch": "feature/new-api", "create": true}}',
-        "best_practices": [
-            "Use descriptive branch names (feature/, fix/, refactor/)",
-            "Commit or stash changes before switching"
-        ]
-    },
-    "git_log": {
-        "name": "git_log",
-        "description": "View commit history.",
-        "parameters": {
-            "limit": {
-                "type": "integer",
-                "required": False,
-                "default": 10,
-                "description": "Number of commits to show"
-            }
-        },
-        "returns": "Commit history with hashes, authors, dates, messages",
-        "example": '{"action": "git_log", "args": {"limit": 5}}',
-        "best_practices": [
-            "Review recent commits to understand context"
-        ]
-    },
-    "git_clone": {
-        "name": "git_clone",
-        "description": "Clone a repository from a URL.",
-        "parameters": {
-            "url": {
-                "type": "string",
-                "required": True,
-                "description": "Repository URL (HTTPS or SSH)"
-            },
-            "path": {
-                "type": "string",
-                "required": False,
-                "default": ".",
-                "description": "Target directory"
-            }
-        },
-        "returns": "Clone result",
-        "example": '{"action": "git_clone", "args": {"url": "https://github.com/user/repo.git", "path": "my-project"}}',
-        "best_practices": [
-            "Use HTTPS for public repos",
-            "Ensure target directory is empty or doesn't exist"
-        ]
-    },
-    "git_init": {
-        "name": "git_init",
-        "description": "Initialize a new git repository in the workspace.",
-        "parameters": {},
-        "returns": "Init confirmation",
-        "example": '{"action": "git_init", "args": {}}',
-        "best_practices": [
-            "Add .gitignore after initialization",
-            "Make an initial commit"
-        ]
-    },
-    "delegate_task": {
-        "name": "delegate_task",
-        "description": "Delegate a sub-task to a specialized agent. Use for complex, self-contained subtasks.",
-        "parameters": {
-            "task": {
-                "type": "string",
-                "required": True,
-                "description": "Clear description of the subtask"
-            },
-            "context": {
-                "type": "string",
-                "required": False,
-                "description": "Relevant context from the main task"
-            }
-        },
-        "returns": "Sub-agent completion result",
-        "example": '{"action": "delegate_task", "args": {"task": "Write unit tests for UserService", "context": "UserService is in src/services/user.py"}}',
-        "best_practices": [
-            "Use for independent, well-defined subtasks",
-            "Provide sufficient context for the sub-agent"
-        ]
-    },
-    "generate_image": {
-        "name": "generate_image",
-        "description": "Generate an AI image from a text prompt. The image is created by Gemini's image generation model.",
-        "parameters": {
-            "prompt": {
-                "type": "string",
-                "required": True,
-                "description": "Detailed description of the image to generate"
-            },
-            "save_to_project": {
-                "type": "boolean",
-                "required": False,
-                "default": False,
-                "description": "Whether to save the generated image to the project's assets folder"
-            },
-            "filename": {
-                "type": "string",
-                "required": False,
-                "description": "Custom filename for saved image (without path)"
-            }
-        },
-        "returns": "Image generation request message. The generated image will appear in the response.",
-        "example": '{"action": "generate_image", "args": {"prompt": "A minimalist logo for a coffee shop", "save_to_project": true, "filename": "logo.png"}}',
-        "best_practices": [
-            "Be specific and detailed in your prompt for better results",
-            "Use save_to_project to add generated images to the codebase",
-            "Generated images are saved to assets/images/ by default"
-        ]
-    },
-    "save_image": {
-        "name": "save_image",
-        "description": "Download and save an image from a URL to the project's assets folder.",
-        "parameters": {
-            "url": {
-                "type": "string",
-                "required": True,
-                "description": "Image URL to download"
-            },
-            "filename": {
-                "type": "string",
-                "required": False,
-                "description": "Custom filename (auto-generated if not provided)"
-            },
-            "subdir": {
-                "type": "string",
-                "required": False,
-                "description": "Subdirectory within assets/images"
-            }
-        },
-        "returns": "Path where image was saved, or error message",
-        "example": '{"action": "save_image", "args": {"url": "https://example.com/image.png", "filename": "hero.png"}}',
-        "best_practices": [
-            "Use to save AI-generated images or web images to the project",
-            "Specify meaningful filenames for organization"
-        ]
-    },
-    "save_generated_images": {
-        "name": "save_generated_images",
-        "description": "Save all recently generated images to the project's assets folder.",
-        "parameters": {
-            "subdir": {
-                "type": "string",
-                "required": False,
-                "description": "Subdirectory within assets/images"
-            }
-        },
-        "returns": "List of saved image paths",
-        "example": '{"action": "save_generated_images", "args": {"subdir": "generated"}}',
-        "best_practices": [
-            "Use after generating multiple images to save all at once",
-            "Organize with subdirectories for different purposes"
-        ]
-    }
-}
+def _tool_schemas() -> Dict[str, Dict[str, Any]]:
+    """Import the tool schemas on first use and keep them as a module global."""
+    global TOOL_SCHEMAS
+    from .tool_schemas import TOOL_SCHEMAS
+    return TOOL_SCHEMAS
+
+
+def __getattr__(name: str):
+    # PEP 562: keep `coding_prompts.TOOL_SCHEMAS` working without loading the
+    # schemas at import time.
+    if name == "TOOL_SCHEMAS":
+        return _tool_schemas()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# =============================================================================
+# TEMPLATE RENDERING - Templates are parsed once at import, not on every render
+# =============================================================================
+
+CompiledTemplate = Tuple[Tuple[str, Optional[str]], ...]
+
+
+def compile_template(template: str) -> CompiledTemplate:
+    """Split a str.format template into (literal, field_name) pairs."""
+    return tuple(
+        (literal, field_name)
+        for literal, field_name, _spec, _conversion in string.Formatter().parse(template)
+    )
+
+
+def render_template(compiled: CompiledTemplate, values: Dict[str, Any]) -> str:
+    """Render a compiled template; equivalent to template.format(**values)."""
+    return "".join(
+        literal + str(values[field_name]) if field_name is not None else literal
+        for literal, field_name in compiled
+    )
 
 
 # =============================================================================
 # SYSTEM PROMPT - Production-grade agent instructions
+#
+# Ordered from most static to most dynamic: rules, tool catalogue, protocol and
+# standards first, the per-session workspace context last. Everything before
+# "## Current Workspace" is byte-identical across requests, so providers with
+# prefix caching can reuse it (the static prefix is well above the 1024-token
+# minimum most providers require).
 # =============================================================================
 
 CODING_SYSTEM_PROMPT = """You are Flashy, an elite autonomous coding assistant. You operate within the user's local workspace with full access to their filesystem and development tools.
@@ -702,14 +170,7 @@ Always verify your changes:
 
 CRITICAL: Use JSON code blocks for tool calls. Stop immediately after the JSON block.
 
-```json
-{{
-  "action": "tool_name",
-  "args": {{
-    "key": "value"
-  }}
-}}
-```
+""" + as_format_literal(TOOL_CALL_EXAMPLE) + """
 
 ## Error Recovery
 
@@ -735,14 +196,14 @@ All code you write must:
 5. Use meaningful variable and function names
 6. Be secure (no hardcoded secrets, proper input validation)
 
+Execute tasks autonomously. Be thorough, precise, and verify your work.
+
+---
+
 ## Current Workspace
 
 Path: {workspace_path}
 {workspace_context}
-
----
-
-Execute tasks autonomously. Be thorough, precise, and verify your work.
 """
 
 
@@ -767,6 +228,43 @@ Analyze the result above:
 Continue with the appropriate action.
 """
 
+def _compact_tables(markdown: str) -> str:
+    """
+    Rewrite markdown pipe tables as one plain line per row.
+
+    "| `read_file` | Read single file | path |" becomes
+    "- `read_file`: Read single file; path". The header row is kept once as a
+    key and the separator row is dropped, which removes most of the pipe and
+    padding tokens without losing any content.
+    """
+    out = []
+    in_table = False
+    for line in markdown.split("\n"):
+        stripped = line.strip()
+        if not (stripped.startswith("|") and stripped.endswith("|")):
+            in_table = False
+            out.append(line)
+            continue
+        cells = [cell.strip() for cell in stripped.strip("|").split("|")]
+        if all(set(cell) <= set("-: ") for cell in cells):
+            continue  # separator row
+        row = f"{cells[0]}: " + "; ".join(cells[1:])
+        out.append(f"({row})" if not in_table else f"- {row}")
+        in_table = True
+    return "\n".join(out)
+
+
+check_placeholders(CODING_SYSTEM_PROMPT, {"workspace_path", "workspace_context"}, "CODING_SYSTEM_PROMPT")
+_SYSTEM_PROMPT_COMPILED = compile_template(CODING_SYSTEM_PROMPT)
+check_placeholders(CODING_TOOL_RESULT_TEMPLATE, {"tool_name", "status", "output"}, "CODING_TOOL_RESULT_TEMPLATE")
+_TOOL_RESULT_COMPILED = compile_template(CODING_TOOL_RESULT_TEMPLATE)
+
+
+@lru_cache(maxsize=1)
+def _system_prompt_compact_compiled() -> CompiledTemplate:
+    """Compact system prompt, built on first use rather than at import."""
+    return compile_template(_compact_tables(CODING_SYSTEM_PROMPT))
+
 
 # =============================================================================
 # ERROR HANDLING GUIDANCE
@@ -808,45 +306,74 @@ ERROR_RECOVERY_GUIDANCE = {
 }
 
 
+class ErrorRecovery(NamedTuple):
+    """Compiled form of an ERROR_RECOVERY_GUIDANCE entry."""
+    error_type: str
+    pattern: Pattern
+    hint: str
+
+
+# Matched against every failed tool result, so compile the patterns once
+_ERROR_RECOVERY_TABLE: Tuple[ErrorRecovery, ...] = tuple(
+    ErrorRecovery(
+        error_type=error_type,
+        pattern=re.compile(info["pattern"], re.IGNORECASE),
+        hint=f"Recovery hint: {info['recovery']}"
+    )
+    for error_type, info in ERROR_RECOVERY_GUIDANCE.items()
+)
+
+
 # =============================================================================
 # HELPER FUNCTIONS
 # =============================================================================
 
-def get_system_prompt(workspace_path: str, workspace_context: str = "") -> str:
-    """Generate the system prompt with workspace context."""
+@lru_cache(maxsize=32)
+def get_system_prompt(workspace_path: str, workspace_context: str = "", compact: bool = False) -> str:
+    """
+    Generate the system prompt with workspace context.
+
+    compact=True (the compact_system_prompt config key) renders the tool
+    tables as plain lines, which costs noticeably fewer tokens for the same
+    content. Results are cached per argument set, since
+    the context is unchanged across most turns of a session.
+    """
     context_section = ""
     if workspace_context:
         context_section = f"\n{workspace_context}"
 
-    return CODING_SYSTEM_PROMPT.format(
-        workspace_path=workspace_path or "[Not Set]",
-        workspace_context=context_section
-    )
+    compiled = _system_prompt_compact_compiled() if compact else _SYSTEM_PROMPT_COMPILED
+    return render_template(compiled, {
+        "workspace_path": workspace_path or "[Not Set]",
+        "workspace_context": context_section
+    })
 
 
-def get_tool_result_template(tool_name: str, output: str, success: bool = True) -> str:
-    """Format a tool result for the agent."""
+def get_tool_result_template(tool_name: str, output: str, success: bool = True, hint: str = "") -> str:
+    """Format a tool result for the agent, optionally followed by a recovery hint."""
     status = "SUCCESS" if success else "ERROR"
-    return CODING_TOOL_RESULT_TEMPLATE.format(
-        tool_name=tool_name,
-        status=status,
-        output=output
-    )
+    result = render_template(_TOOL_RESULT_COMPILED, {
+        "tool_name": tool_name,
+        "status": status,
+        "output": output
+    })
+    return f"{result}\n{hint}" if hint else result
 
 
 def get_tool_schema(tool_name: str) -> Dict[str, Any]:
     """Get the schema for a specific tool."""
-    return TOOL_SCHEMAS.get(tool_name)
+    return _tool_schemas().get(tool_name)
 
 
 def get_all_tool_schemas() -> Dict[str, Dict[str, Any]]:
     """Get all tool schemas."""
-    return TOOL_SCHEMAS
+    return _tool_schemas()
 
 
+@lru_cache(maxsize=64)
 def format_tool_help(tool_name: str) -> str:
-    """Format detailed help for a tool."""
-    schema = TOOL_SCHEMAS.get(tool_name)
+    """Format detailed help for a tool. The schemas are static, so each tool renders once."""
+    schema = _tool_schemas().get(tool_name)
     if not schema:
         return f"Unknown tool: {tool_name}"
 
@@ -889,12 +416,9 @@ def format_tool_help(tool_name: str) -> str:
 
 def get_error_recovery_hint(error_message: str) -> str:
     """Get recovery hints for common errors."""
-    import re
-    error_lower = error_message.lower()
-
-    for error_type, info in ERROR_RECOVERY_GUIDANCE.items():
-        if re.search(info["pattern"], error_lower, re.IGNORECASE):
-            return f"Recovery hint: {info['recovery']}"
+    for entry in _ERROR_RECOVERY_TABLE:
+        if entry.pattern.search(error_message):
+            return entry.hint
 
     return "Analyze the error message and try a different approach."
 
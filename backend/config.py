@@ -9,18 +9,38 @@ DEFAULT_CONFIG = {
     "Secure_1PSIDCC": "",
     "model": "G_2_5_FLASH",
     "GITHUB_PAT": "",
-    "active_provider": "gemini"
+    "active_provider": "gemini",
+    "max_gemini_concurrency": 8,
+    "max_sessions": 1024,
+    "compact_system_prompt": False
 }
 
+# ((mtime_ns, size), parsed config). load_config runs on every chat turn and
+# several tool calls, so the file is only parsed again when it changes on disk.
+_config_cache = None
+
+def _config_signature():
+    st = os.stat(CONFIG_FILE)
+    return st.st_mtime_ns, st.st_size
+
 def load_config():
+    global _config_cache
     if not os.path.exists(CONFIG_FILE):
         with open(CONFIG_FILE, "w") as f:
             json.dump(DEFAULT_CONFIG, f, indent=4)
         return DEFAULT_CONFIG
-    
+
+    signature = _config_signature()
+    if _config_cache is not None and _config_cache[0] == signature:
+        return _config_cache[1]
+
     with open(CONFIG_FILE, "r") as f:
-        return json.load(f)
+        config = json.load(f)
+    _config_cache = (signature, config)
+    return config
 
 def save_config(config):
+    global _config_cache
     with open(CONFIG_FILE, "w") as f:
         json.dump(config, f, indent=4)
+    _config_cache = (_config_signature(), config)
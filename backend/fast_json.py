@@ -0,0 +1,40 @@
+"""
+Fast JSON Module
+
+Thin wrapper that uses orjson when it is installed and falls back to the
+standard library otherwise. Hot paths (provider SSE parsing, tool-call
+parsing, NDJSON streaming) go through here so the speedup is opt-in by
+installing orjson. The stdlib fallback serializes the way orjson does
+(compact separators, non-ASCII kept as UTF-8), so output is the same with
+or without it, but differs from plain json.dumps defaults.
+
+orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers keep
+catching json.JSONDecodeError either way.
+"""
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Parse JSON from str or bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps(obj: Any) -> str:
+    """Serialize to a compact JSON string."""
+    return dumps_bytes(obj).decode("utf-8")
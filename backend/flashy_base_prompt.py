@@ -0,0 +1,44 @@
+"""
+Flashy Base Prompt Module
+
+Prompt fragments shared by every Flashy agent prompt. Keeping a single copy
+means each agent sends byte-identical text for these sections.
+
+Fragments are plain text. Agent prompts are str.format templates, so embed
+them with as_format_literal() to escape their braces.
+"""
+
+import string
+from typing import Set
+
+TOOL_CALL_EXAMPLE = """```json
+{
+  "action": "tool_name",
+  "args": {
+    "key": "value"
+  }
+}
+```"""
+
+
+def as_format_literal(text: str) -> str:
+    """Escape braces so text can be embedded in a str.format template."""
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def check_placeholders(template: str, expected: Set[str], label: str) -> None:
+    """
+    Fail at import time if a prompt template's fields differ from expected.
+
+    A stray or missing {field} would otherwise only surface as a KeyError when
+    the prompt is rendered for a request.
+    """
+    fields = {
+        field_name
+        for _literal, field_name, _spec, _conversion in string.Formatter().parse(template)
+        if field_name is not None
+    }
+    if fields != expected:
+        raise ValueError(
+            f"{label} placeholders {sorted(fields)} do not match expected {sorted(expected)}"
+        )
@@ -13,20 +13,197 @@ Enhanced Features:
 - Tool execution with retry logic
 """
 
-import asyncio
-import re
-from typing import Dict, Any, List, Optional, AsyncGenerator
+from __future__ import annotations
 
-from gemini_webapi import GeminiClient
-from gemini_webapi.constants import Model
+import asyncio
+import os
+import random
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Dict, Any, List, Optional, AsyncGenerator, Set, Tuple
 
 from .config import load_config
-from .coding_agent import CodingAgent, ToolCallStatus
+from .coding_agent import CodingAgent, ToolCallStatus, TOOL_JSON_BLOCK_RE, STANDALONE_TOOL_JSON_RE
 from .coding_prompts import get_system_prompt, get_tool_result_template
 from .response_filter import ResponseFilter, ThoughtFilter
 from .storage import save_chat_message, save_chat_metadata, get_chat_metadata
 from .image_service import get_image_service, ImageResult, ImageType
-from .providers import get_provider_service, BaseProvider
+from .providers import get_provider_service, BaseProvider, DeepInfraProvider, QwenProvider, GradientProvider
+from .prompt_cache_stats import prompt_cache_stats
+
+# gemini_webapi pulls in its whole HTTP stack, so it is imported on first use
+if TYPE_CHECKING:
+    from gemini_webapi import GeminiClient
+    from gemini_webapi.constants import Model
+
+
+@lru_cache(maxsize=1)
+def _model_lookup() -> Tuple[Dict[str, Model], Model]:
+    """Model enum members by name (as stored in config) and the default model."""
+    from gemini_webapi.constants import Model
+    return {m.name: m for m in Model}, Model.G_2_5_FLASH
+
+
+def _resolve_model(model_name: str) -> Model:
+    """Map a configured model name to the Model enum, falling back to the default."""
+    lookup, default = _model_lookup()
+    return lookup.get(model_name, default)
+
+
+# Gemini request limits, shared by the agent loop and delegated sub-agents
+GEMINI_INIT_TIMEOUT = 600    # seconds for client.init()
+GEMINI_SEND_TIMEOUT = 120    # seconds per send_message
+GEMINI_MAX_RETRIES = 3
+BACKOFF_CAP = 30.0           # longest sleep between retries, seconds
+
+# Base delay per attempt (1s, 2s, 4s, ...); also bounds how many retries are allowed
+_BACKOFF = tuple(min(BACKOFF_CAP, 2.0 ** i) for i in range(8))
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Backoff delay for `attempt` with +/-30% jitter, capped at BACKOFF_CAP."""
+    return min(BACKOFF_CAP, _BACKOFF[attempt] * random.uniform(0.7, 1.3))
+
+
+# Resend an unchanged system prompt after this many turns, in case the provider
+# has trimmed it from a long conversation.
+_SYSTEM_PROMPT_REFRESH_TURNS = 10
+
+# Fixed framing around the user's message in agent mode
+_USER_REQUEST_HEAD = "## User Request\n"
+_USER_REQUEST_TAIL = "\n\nExecute this task using the appropriate tools."
+
+
+# Upper bound on per-session state kept in memory
+MAX_SESSIONS = 1024
+
+
+class _LRUDict(OrderedDict):
+    """Dict that keeps at most `maxsize` entries, evicting the least recently used."""
+
+    def __init__(self, maxsize: int = MAX_SESSIONS, on_evict: Optional[Callable[[Any, Any], None]] = None):
+        super().__init__()
+        self.maxsize = maxsize
+        self.on_evict = on_evict
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if len(self) > self.maxsize:
+            evicted_key, evicted = self.popitem(last=False)
+            if self.on_evict is not None:
+                self.on_evict(evicted_key, evicted)
+
+
+class _SessionState:
+    """Everything kept in memory for one chat session, behind a single lookup."""
+
+    __slots__ = ("chat", "history", "agent", "interrupt", "system_prompt")
+
+    def __init__(self):
+        self.chat: Any = None                                  # Gemini chat session
+        self.history: Optional[List[Dict[str, str]]] = None    # message history for other providers
+        self.agent: Optional[CodingAgent] = None
+        self.interrupt: Optional[asyncio.Event] = None         # set to interrupt the running turn
+        # (provider, system prompt, turns since it was sent)
+        self.system_prompt: Optional[Tuple[str, str, int]] = None
+
+
+class _StreamCoalescer:
+    """
+    Merges consecutive small text/thought deltas into fewer stream chunks.
+
+    Provider streams often deliver a few characters per chunk; forwarding each
+    one costs an event-loop round trip and a frame to the client. Deltas of the
+    same kind are buffered for at most MAX_DELAY after the last flush, up to
+    MAX_CHARS, and flushed as soon as the kind changes. Iterating the provider
+    stream through paced() keeps that deadline even when the provider stalls.
+    """
+
+    __slots__ = ("_kind", "_parts", "_size", "_last_flush")
+
+    MAX_CHARS = 4096
+    MAX_DELAY = 0.025
+
+    def __init__(self):
+        self._kind: Optional[str] = None
+        self._parts: List[str] = []
+        self._size = 0
+        self._last_flush = time.monotonic()
+
+    def add(self, kind: str, delta: str) -> List[Dict[str, str]]:
+        """Buffer a delta; returns the chunks that are due to be yielded."""
+        if not delta:
+            return []
+        out = self.flush() if kind != self._kind else []
+        self._kind = kind
+        self._parts.append(delta)
+        self._size += len(delta)
+        if self._size >= self.MAX_CHARS or time.monotonic() - self._last_flush >= self.MAX_DELAY:
+            out.extend(self.flush())
+        return out
+
+    def _pending_delay(self) -> Optional[float]:
+        """Seconds until buffered output is due, or None when nothing is buffered."""
+        if not self._parts:
+            return None
+        return max(0.0, self.MAX_DELAY - (time.monotonic() - self._last_flush))
+
+    async def paced(
+        self,
+        stream: AsyncGenerator[Dict[str, Any], None],
+        interrupt: Optional[asyncio.Event] = None
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Iterate `stream`, yielding an empty dict whenever buffered output falls
+        due before the next chunk arrives; the caller flushes on it.
+
+        Raises asyncio.CancelledError as soon as `interrupt` is set, even while
+        the provider is stalled between chunks.
+        """
+        iterator = stream.__aiter__()
+        pending_next = None
+        interrupted = asyncio.ensure_future(interrupt.wait()) if interrupt is not None else None
+        try:
+            while True:
+                if pending_next is None:
+                    pending_next = asyncio.ensure_future(iterator.__anext__())
+                waiting = {pending_next} if interrupted is None else {pending_next, interrupted}
+                # asyncio.wait leaves the read running on timeout, unlike wait_for
+                done, _ = await asyncio.wait(
+                    waiting, timeout=self._pending_delay(), return_when=asyncio.FIRST_COMPLETED
+                )
+                if interrupted is not None and interrupted in done:
+                    raise asyncio.CancelledError()
+                if not done:
+                    yield {}
+                    continue
+                finished, pending_next = pending_next, None
+                try:
+                    chunk = finished.result()
+                except StopAsyncIteration:
+                    return
+                yield chunk
+        finally:
+            for task in (pending_next, interrupted):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    def flush(self) -> List[Dict[str, str]]:
+        """Return whatever is buffered as a single chunk."""
+        self._last_flush = time.monotonic()
+        if not self._parts:
+            return []
+        chunk = {self._kind: "".join(self._parts)}
+        self._parts = []
+        self._size = 0
+        return [chunk]
 
 
 class GeminiService:
@@ -41,32 +218,39 @@ class GeminiService:
     - Persistent session storage
     """
 
+    __slots__ = (
+        "gemini_client", "gemini_model", "config", "_state", "workspace_path", "workspace_id",
+        "response_filter", "thought_filter", "gemini_semaphore",
+    )
+
     def __init__(self):
         self.gemini_client: Optional[GeminiClient] = None
+        self.gemini_model: Optional[Model] = None
         self.config = load_config()
-        self.sessions: Dict[str, Any] = {} # For Gemini chat objects mainly
-        self.provider_sessions: Dict[str, List[Dict[str,str]]] = {} # For other providers history
-        self.agents: Dict[str, CodingAgent] = {}
-        self.interrupted_sessions: set = set()
-        self.active_tasks: Dict[str, asyncio.Task] = {}
+        self._init_session_state()
         self.workspace_path: Optional[str] = None
         self.workspace_id: Optional[str] = None
 
+        # Caps in-flight Gemini requests across all sessions so a burst of
+        # chats queues here instead of stampeding the web endpoint
+        self.gemini_semaphore = asyncio.Semaphore(
+            self.config.get("max_gemini_concurrency", 8)
+        )
+
         # Initialize filters
         self.response_filter = ResponseFilter(aggressive=False)
         self.thought_filter = ThoughtFilter()
 
     def set_workspace(self, path: str, workspace_id: str = None) -> str:
         """Set workspace for all agent sessions."""
-        import os
-
         if os.path.isdir(path):
             self.workspace_path = os.path.abspath(path)
             self.workspace_id = workspace_id
 
             # Update existing agents
-            for agent in self.agents.values():
-                agent.set_workspace(self.workspace_path)
+            for state in self._state.values():
+                if state.agent is not None:
+                    state.agent.set_workspace(self.workspace_path)
 
             return f"Workspace set to: {self.workspace_path}"
         return f"Error: '{path}' is not a valid directory."
@@ -84,6 +268,10 @@ class GeminiService:
         """Get or initialize Gemini client."""
         if self.gemini_client is None:
             self.config = load_config()
+            # Resolved once per config load; reset() clears both
+            self.gemini_model = _resolve_model(self.config.get("model", "G_2_5_FLASH"))
+
+            from gemini_webapi import GeminiClient
 
             self.gemini_client = GeminiClient(
                 self.config["Secure_1PSID"],
@@ -96,7 +284,7 @@ class GeminiService:
                 self.gemini_client.cookies["__Secure-1PSIDCC"] = self.config["Secure_1PSIDCC"]
 
             await self.gemini_client.init(
-                timeout=600,
+                timeout=GEMINI_INIT_TIMEOUT,
                 auto_close=False,
                 close_delay=300,
                 auto_refresh=True
@@ -104,22 +292,32 @@ class GeminiService:
 
         return self.gemini_client
 
+    def _session(self, session_id: str) -> _SessionState:
+        """Get or create the in-memory state for a session."""
+        state = self._state.get(session_id)
+        if state is None:
+            state = self._state[session_id] = _SessionState()
+        else:
+            self._state.move_to_end(session_id)
+        return state
+
     def get_agent(self, session_id: str) -> CodingAgent:
         """Get or create a coding agent for a session."""
-        if session_id not in self.agents:
-            self.agents[session_id] = CodingAgent(
+        state = self._session(session_id)
+        if state.agent is None:
+            state.agent = CodingAgent(
                 workspace_path=self.workspace_path,
                 session_id=session_id
             )
-        return self.agents[session_id]
+        return state.agent
 
     async def get_gemini_chat_session(self, session_id: str, history: Any = None):
         """Get or create a Gemini chat session object."""
         client = await self.get_gemini_client()
+        state = self._session(session_id)
 
-        if session_id not in self.sessions:
-            model_name = self.config.get("model", "G_2_5_FLASH")
-            model = getattr(Model, model_name, Model.G_2_5_FLASH)
+        if state.chat is None:
+            model = self.gemini_model
 
             # Try to restore from saved metadata
             saved_meta = get_chat_metadata(session_id)
@@ -134,48 +332,160 @@ class GeminiService:
             else:
                 chat = client.start_chat(model=model)
 
-            self.sessions[session_id] = chat
+            state.chat = chat
+
+        return state.chat
+
+    def _init_session_state(self):
+        """Create the LRU-bounded session table, sized from config."""
+        # Chat, history, agent and system-prompt bookkeeping are evicted
+        # together, so a returning session starts cleanly and resends the prompt
+        self._state: Dict[str, _SessionState] = _LRUDict(
+            self.config.get("max_sessions", MAX_SESSIONS),
+            on_evict=self._evict_session
+        )
 
-        return self.sessions[session_id]
+    @staticmethod
+    def _evict_session(session_id: str, state: _SessionState):
+        """Stop any turn still running for a session dropped from the LRU."""
+        if state.interrupt is not None:
+            state.interrupt.set()
+        print(f"[GeminiService] Evicted idle session {session_id}")
 
     def interrupt_session(self, session_id: str):
         """Interrupt a running session."""
-        self.interrupted_sessions.add(session_id)
+        # Plain lookup: creating state for an unknown id could evict a live session
+        state = self._state.get(session_id)
+        if state is None:
+            return
+        if state.interrupt is None:
+            state.interrupt = asyncio.Event()
+        state.interrupt.set()
+
+    async def _interruptible(self, awaitable, session_id: str):
+        """
+        Await `awaitable`, abandoning it as soon as the session is interrupted.
+
+        Raises asyncio.CancelledError on interruption, so a long model call is
+        dropped immediately rather than after it completes.
+        """
+        state = self._state.get(session_id)
+        event = state.interrupt if state is not None else None
+        if event is None:
+            return await awaitable
+
+        work = asyncio.ensure_future(awaitable)
+        interrupted = asyncio.ensure_future(event.wait())
+        try:
+            done, _ = await asyncio.wait({work, interrupted}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (work, interrupted):
+                if not task.done():
+                    task.cancel()
+
+        if work in done:
+            return work.result()
+        raise asyncio.CancelledError()
 
-        if session_id in self.active_tasks:
-            task = self.active_tasks[session_id]
-            if task and not task.done():
-                task.cancel()
-                print(f"[GeminiService] Cancelled task for session {session_id}")
+    async def _bounded_send(self, send, timeout: int):
+        """Run a Gemini send under the concurrency cap; the timeout excludes queueing."""
+        async with self.gemini_semaphore:
+            return await asyncio.wait_for(send, timeout=timeout)
 
-    def _is_interrupted(self, session_id: str) -> bool:
-        """Check if session is interrupted."""
-        return session_id in self.interrupted_sessions
+    def _system_prompt_due(self, session_id: str, provider_name: str, system_context: str) -> bool:
+        """
+        Whether this turn must carry the system prompt.
 
-    def _clean_response_text(self, text: str, tool_call_raw: str = None) -> str:
+        The chat history already holds the prompt from an earlier turn, so it is
+        only resent when it changed, the provider changed, or it is due for a
+        periodic refresh.
+        """
+        state = self._session(session_id)
+        sent = state.system_prompt
+        if (
+            sent
+            and sent[0] == provider_name
+            and sent[1] == system_context
+            and sent[2] < _SYSTEM_PROMPT_REFRESH_TURNS
+        ):
+            state.system_prompt = (provider_name, system_context, sent[2] + 1)
+            return False
+        state.system_prompt = (provider_name, system_context, 1)
+        return True
+
+    def _clean_response_text(self, text: str, tool_call_span: Optional[Tuple[int, int]] = None) -> str:
         """Clean response text by removing JSON tool calls and artifacts."""
         if not text:
             return ""
 
         cleaned = text
 
-        # Remove specific tool call match
-        if tool_call_raw:
-            cleaned = cleaned.replace(tool_call_raw, "").strip()
+        # Cut out the parsed tool call by the span parse_tool_call recorded
+        if tool_call_span:
+            start, end = tool_call_span
+            cleaned = (cleaned[:start] + cleaned[end:]).strip()
 
-        # Remove orphaned JSON blocks that look like tool calls
-        json_block_pattern = r'```json\s*\{[^`]*?"(?:action|tool|name)"\s*:[^`]*?\}\s*```'
-        cleaned = re.sub(json_block_pattern, '', cleaned, flags=re.DOTALL).strip()
+        # Remove orphaned JSON blocks that look like tool calls; plain prose
+        # (the usual final answer) skips the regexes via substring checks
+        if "```" in cleaned:
+            cleaned = TOOL_JSON_BLOCK_RE.sub('', cleaned).strip()
 
         # Remove standalone tool-call JSON
-        standalone_pattern = r'(?<![`\w])\{\s*"(?:action|tool)"\s*:\s*"[^"]+"\s*,\s*"args"\s*:\s*\{[^}]*\}\s*\}(?![`\w])'
-        cleaned = re.sub(standalone_pattern, '', cleaned).strip()
+        if '"args"' in cleaned:
+            cleaned = STANDALONE_TOOL_JSON_RE.sub('', cleaned).strip()
 
         # Apply response filter (removes YouTube links, etc.)
         cleaned = self.response_filter.filter(cleaned)
 
         return cleaned
 
+    @staticmethod
+    def _attached_files_section(files: List[str]) -> str:
+        """Inline uploaded file contents into the prompt, built with a single join."""
+        try:
+            import chardet
+        except ImportError:
+            chardet = None
+
+        sections = ["\n\nAttached Files Content:\n"]
+        for fpath in files:
+            try:
+                with open(fpath, "rb") as f:
+                    b_content = f.read(20000) # Limit size
+                encoding = (chardet.detect(b_content)['encoding'] if chardet else None) or 'utf-8'
+                decoded = b_content.decode(encoding, errors='ignore')
+                sections.append(f"\n--- {fpath} ---\n{decoded}\n")
+            except Exception as e:
+                sections.append(f"\n--- {fpath} ---\n[Error reading file: {e}]\n")
+        return "".join(sections)
+
+    @staticmethod
+    def _track_image(image_service, img, img_url: str):
+        """Record an image from a Gemini response in the image service."""
+        is_generated = "generated" in type(img).__name__.lower()
+        image_service.generated_images.append(ImageResult(
+            url=img_url,
+            image_type=ImageType.GENERATED if is_generated else ImageType.WEB,
+            title=getattr(img, 'title', None),
+            alt=getattr(img, 'alt', None)
+        ))
+
+    @staticmethod
+    def _final_chunk(
+        text: Optional[str] = None,
+        images: Optional[List[str]] = None,
+        error: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Build the chunk that ends a response stream."""
+        chunk: Dict[str, Any] = {"is_final": True}
+        if text is not None:
+            chunk["text"] = text
+        if images is not None:
+            chunk["images"] = images
+        if error is not None:
+            chunk["error"] = error
+        return chunk
+
     def _separate_thinking(self, text: str) -> tuple:
         """Separate thinking from response using enhanced filter."""
         if not text:
@@ -187,46 +497,49 @@ class GeminiService:
         chat, # Can be Gemini Chat or Provider Instance
         message: str,
         files: List[str] = None,
-        max_retries: int = 3,
-        timeout: int = 120,
+        max_retries: int = GEMINI_MAX_RETRIES,
+        timeout: int = GEMINI_SEND_TIMEOUT,
         provider: str = "gemini",
         session_id: str = None
     ):
         """Send message with retry logic and timeout."""
         last_error = None
+        max_retries = min(max_retries, len(_BACKOFF))
 
         if provider == "gemini":
             for attempt in range(max_retries):
                 try:
                     if files:
-                        response = await asyncio.wait_for(
-                            chat.send_message(message, files=files),
-                            timeout=timeout
-                        )
+                        send = chat.send_message(message, files=files)
                     else:
-                        response = await asyncio.wait_for(
-                            chat.send_message(message),
-                            timeout=timeout
-                        )
-                    return response
+                        send = chat.send_message(message)
+                    return await self._interruptible(
+                        self._bounded_send(send, timeout),
+                        session_id
+                    )
 
                 except asyncio.CancelledError:
                     raise
 
-                except asyncio.TimeoutError:
-                    last_error = f"Request timed out after {timeout}s"
+                except (asyncio.TimeoutError, ConnectionError) as e:
+                    if isinstance(e, asyncio.TimeoutError):
+                        last_error = f"Request timed out after {timeout}s"
+                    else:
+                        last_error = f"Connection error: {e}"
                     print(f"[GeminiService] Attempt {attempt + 1}/{max_retries}: {last_error}")
                     if attempt < max_retries - 1:
-                        await asyncio.sleep(2 ** attempt)
+                        await asyncio.sleep(_backoff_delay(attempt))
 
                 except Exception as e:
                     last_error = str(e)
                     print(f"[GeminiService] Attempt {attempt + 1}/{max_retries}: {last_error}")
 
-                    error_str = str(e).lower()
+                    # Only transient generation failures are retried; auth, quota
+                    # and bad-request errors fail fast.
+                    error_str = last_error.lower()
                     if "invalid response" in error_str or "failed to generate" in error_str:
                         if attempt < max_retries - 1:
-                            await asyncio.sleep(2 ** attempt)
+                            await asyncio.sleep(_backoff_delay(attempt))
                             continue
                     raise
             
@@ -247,16 +560,19 @@ class GeminiService:
         Generate response from configured provider with full agent loop.
         """
         provider_name = self.get_active_provider()
+        state = self._session(session_id)
         agent = self.get_agent(session_id) if session_id else None
         
         # Track message parts for saving
         message_parts: List[Dict[str, Any]] = []
         images: List[str] = []
+        seen_images: Set[str] = set()   # index over `images` for de-duplication
+        cache_requests_before = prompt_cache_stats.requests
 
         try:
-            # Clear previous interruption
-            if session_id in self.interrupted_sessions:
-                self.interrupted_sessions.remove(session_id)
+            # Fresh interrupt event for this turn (drops any stale interruption);
+            # bound locally so the loop's checks are a plain flag read
+            interrupt_event = state.interrupt = asyncio.Event()
 
             # Reset agent context for new conversation turn
             if agent:
@@ -265,24 +581,18 @@ class GeminiService:
             # Build prompt with system context
             if agent and self.workspace_path:
                 system_context = agent.get_system_prompt()
-                full_prompt = f"{system_context}\n\n## User Request\n{text}\n\nExecute this task using the appropriate tools."
+                # Assembled in one join so the (large) system prompt is copied once
+                if self._system_prompt_due(session_id, provider_name, system_context):
+                    full_prompt = "".join((system_context, "\n\n", _USER_REQUEST_HEAD, text, _USER_REQUEST_TAIL))
+                else:
+                    full_prompt = "".join((_USER_REQUEST_HEAD, text, _USER_REQUEST_TAIL))
                 
                 # Append file content if provided (for providers that don't support file upload API)
                 if files and provider_name != "gemini":
                     # For non-Gemini providers, read file content and append to prompt
                     # This is a simplification; optimal way is to use context management tool
                     # But for "UploadFile", we usually want them in context immediately.
-                    full_prompt += "\n\nAttached Files Content:\n"
-                    for fpath in files:
-                        try:
-                            import chardet
-                            with open(fpath, "rb") as f:
-                                b_content = f.read(20000) # Limit size
-                                encoding = chardet.detect(b_content)['encoding'] or 'utf-8'
-                                decoded = b_content.decode(encoding, errors='ignore')
-                                full_prompt += f"\n--- {fpath} ---\n{decoded}\n"
-                        except Exception as e:
-                            full_prompt += f"\n--- {fpath} ---\n[Error reading file: {e}]\n"
+                    full_prompt += self._attached_files_section(files)
             else:
                  full_prompt = text
 
@@ -294,67 +604,59 @@ class GeminiService:
                 chat_session = await self.get_gemini_chat_session(session_id, history=history)
             else:
                 # Load provider history
-                if session_id not in self.provider_sessions:
-                    self.provider_sessions[session_id] = []
+                if state.history is None:
+                    state.history = []
                 # Append user message to history
-                self.provider_sessions[session_id].append({"role": "user", "content": full_prompt})
+                state.history.append({"role": "user", "content": full_prompt})
             
             # --- Agent Loop ---
+            # Each iteration moves through generate -> decide -> act. Interruption
+            # is checked on entering a model call and on entering a tool call;
+            # interrupts during either await surface as CancelledError and are
+            # reported once by the handler below.
             if agent and self.workspace_path:
-                max_iterations = 20
-                iteration = 0
+                max_iterations = agent.context.max_iterations
 
                 current_prompt = full_prompt
                 
-                while iteration < max_iterations:
-                    # Check for interruption
-                    if self._is_interrupted(session_id):
-                        yield {"text": "\n\n*Agent interrupted by user.*", "is_final": True}
-                        break
+                for iteration in range(max_iterations):
+                    if interrupt_event.is_set():
+                        raise asyncio.CancelledError()
 
-                    # Increment agent iteration
-                    if not agent.increment_iteration():
-                        yield {
-                            "text": "\n\n*Agent reached maximum iterations.*",
-                            "is_final": True
-                        }
-                        break
+                    agent.increment_iteration()
                     
                     # --- Generation Step ---
                     response_text = ""
                     api_thoughts = ""
+                    # (thinking, clean text); streamed providers fill this in as they go
+                    separated = None
                     
                     if provider_name == "gemini":
                         if iteration == 0:
                             # Initial user request
-                             gemini_resp = await self._send_with_retry(chat_session, current_prompt, files=files if iteration == 0 else None)
+                             gemini_resp = await self._send_with_retry(chat_session, current_prompt, files=files if iteration == 0 else None, session_id=session_id)
                         else:
                             # Feedback loop
-                             gemini_resp = await self._send_with_retry(chat_session, current_prompt)
+                             gemini_resp = await self._send_with_retry(chat_session, current_prompt, session_id=session_id)
                         
                         response_text = gemini_resp.text or ""
                         api_thoughts = getattr(gemini_resp, 'thoughts', None) or ""
                         
                         # Yield any images found in gemini response
                         if hasattr(gemini_resp, 'images') and gemini_resp.images:
+                             # Fetched once per response: each lookup re-validates the workspace on disk
+                             image_service = get_image_service(self.workspace_path)
                              for img in gemini_resp.images:
                                 img_url = getattr(img, 'url', '')
-                                if img_url and img_url not in images:
+                                if img_url and img_url not in seen_images:
+                                    seen_images.add(img_url)
                                     images.append(img_url)
-                                    # Track
-                                    img_type = "generated" if "generated" in type(img).__name__.lower() else "web"
-                                    image_service = get_image_service(self.workspace_path)
-                                    image_service.generated_images.append(ImageResult(
-                                            url=img_url,
-                                            image_type=ImageType.GENERATED if img_type == "generated" else ImageType.WEB,
-                                            title=getattr(img, 'title', None),
-                                            alt=getattr(img, 'alt', None)
-                                     ))
+                                    self._track_image(image_service, img, img_url)
                     else:
                         # --- Other Providers ---
                         provider_service_inst = get_provider_service(provider_name)
                         if not provider_service_inst:
-                            yield {"error": f"Provider '{provider_name}' implementation not found.", "is_final": True}
+                            yield self._final_chunk(error=f"Provider '{provider_name}' implementation not found.")
                             return
                             
                         # Prepare kwargs
@@ -363,40 +665,67 @@ class GeminiService:
                         }
                         
                         # Generate
-                        # Note: provider_sessions already has the history up to the last user prompt
+                        # Note: state.history already has the history up to the last user prompt
                         # If this is iteration > 0, we need to append the tool result as a user message
                         if iteration > 0:
-                             self.provider_sessions[session_id].append({"role": "user", "content": current_prompt})
+                             state.history.append({"role": "user", "content": current_prompt})
                              
                         accumulated_text = ""
                         accumulated_thought = ""
+                        # Route embedded <think> blocks to thoughts as they stream
+                        thought_parser = self.thought_filter.stream_parser()
+                        coalescer = _StreamCoalescer()
                         
-                        async for chunk in provider_service_inst.generate_stream(
-                            self.provider_sessions[session_id], 
+                        async for chunk in coalescer.paced(provider_service_inst.generate_stream(
+                            state.history,
                             self.config.get("model", ""), 
                             **kwargs
-                        ):
+                        ), interrupt_event):
+                             if interrupt_event.is_set():
+                                 raise asyncio.CancelledError()
+
+                             if not chunk:
+                                 # Provider is quiet and buffered output is due
+                                 for out in coalescer.flush():
+                                     yield out
+                                 continue
+
                              if "error" in chunk:
+                                 for out in coalescer.flush():
+                                     yield out
                                  yield {"error": chunk["error"]}
                                  message_parts.append({"type": "error", "content": chunk["error"]})
+
+                             if "usage" in chunk:
+                                 prompt_cache_stats.record(chunk["usage"])
                              
                              if "thought" in chunk:
                                  accumulated_thought += chunk["thought"]
-                                 yield {"thought": chunk["thought"]}
+                                 for out in coalescer.add("thought", chunk["thought"]):
+                                     yield out
                                  # We'll merge these later or track them
                                  
                              if "text" in chunk:
                                  accumulated_text += chunk["text"]
-                                 yield {"text": chunk["text"]} # Stream raw text
+                                 thought_delta, text_delta = thought_parser.feed(chunk["text"])
+                                 for out in coalescer.add("thought", thought_delta) + coalescer.add("text", text_delta):
+                                     yield out
+
+                        thought_delta, text_delta = thought_parser.finish()
+                        for out in coalescer.add("thought", thought_delta) + coalescer.add("text", text_delta) + coalescer.flush():
+                            yield out
                                  
                         response_text = accumulated_text
                         api_thoughts = accumulated_thought
+                        separated = thought_parser.result()
                         
                         # Append assistant response to history
-                        self.provider_sessions[session_id].append({"role": "assistant", "content": response_text})
+                        state.history.append({"role": "assistant", "content": response_text})
                     
                     # --- Processing Response ---
-                    embedded_thinking, clean_response = self._separate_thinking(response_text)
+                    if separated is None:
+                        separated = self._separate_thinking(response_text)
+                    embedded_thinking, clean_response = separated
                     
                     # Combine thoughts
                     all_thoughts = ""
@@ -405,9 +734,12 @@ class GeminiService:
                     if embedded_thinking:
                         all_thoughts = f"{all_thoughts}\n\n{embedded_thinking}".strip() if all_thoughts else embedded_thinking
                     
+                    # Gemini responses arrive whole, so everything this step shows
+                    # (thoughts, text, tool call) goes out as a single chunk
+                    step_chunk: Dict[str, Any] = {}
                     if all_thoughts:
                         if provider_name == "gemini":
-                            yield {"thought": all_thoughts}
+                            step_chunk["thought"] = all_thoughts
                         message_parts.append({"type": "thought", "content": all_thoughts})
                     
                     # Parse tool call from clean response
@@ -419,58 +751,52 @@ class GeminiService:
                              # Gemini yields text after complete generation, others yielded during stream
                              final_text = self._clean_response_text(clean_response)
                              if final_text:
-                                yield {"text": final_text, "images": images, "is_final": True}
+                                yield {**step_chunk, **self._final_chunk(final_text, images)}
                                 message_parts.append({"type": "text", "content": final_text})
                              elif images:
-                                 yield {"text": "", "images": images, "is_final": True}
+                                 yield {**step_chunk, **self._final_chunk("", images)}
                              else:
-                                 yield {"text": "[Agent completed]", "is_final": True}
+                                 yield {**step_chunk, **self._final_chunk("[Agent completed]")}
                         else:
                              # For streaming providers, we assume text was already yielded. 
                              # We just send is_final. But we should save the full text
                              message_parts.append({"type": "text", "content": clean_response})
-                             yield {"images": images, "is_final": True}
+                             yield self._final_chunk(images=images)
                         break
                     
                     # Handle text before tool call (For Gemini mostly)
                     if provider_name == "gemini":
                         display_text = self._clean_response_text(
                             clean_response,
-                            tool_call.get("raw_match")
+                            tool_call.get("span")
                         )
                         if display_text:
-                            yield {"text": display_text + "\n"}
+                            step_chunk["text"] = display_text + "\n"
                             message_parts.append({"type": "text", "content": display_text})
                     else:
                         if clean_response:
                             message_parts.append({"type": "text", "content": clean_response})
                     
                     # Yield tool call
-                    yield {
-                        "tool_call": {
-                            "name": tool_call["name"],
-                            "args": tool_call["args"]
-                        }
-                    }
-                    message_parts.append({
-                        "type": "tool_call",
-                        "content": {
-                            "name": tool_call["name"],
-                            "args": tool_call["args"]
-                        }
-                    })
+                    call = {"name": tool_call["name"], "args": tool_call["args"]}
+                    step_chunk["tool_call"] = call
+                    yield step_chunk
+                    message_parts.append({"type": "tool_call", "content": call})
                     
-                     # Check interruption before tool execution
-                    if self._is_interrupted(session_id):
-                        yield {"text": "\n\n*Agent interrupted by user.*", "is_final": True}
-                        break
-                        
-                    # Execute tool
+                    # Check interruption before tool execution
+                    if interrupt_event.is_set():
+                        raise asyncio.CancelledError()
+
+                    # Execute tool; anything it produces for the client (e.g. images)
+                    # is sent together with its result
+                    result_chunk: Dict[str, Any] = {}
                     try:
                         if tool_call["name"] == "delegate_task":
                             task = tool_call["args"].get("task", "")
                             context = tool_call["args"].get("context", "")
-                            tool_result = await self.run_delegated_task(task, context)
+                            tool_result = await self._interruptible(
+                                self.run_delegated_task(task, context), session_id
+                            )
                             tool_status = ToolCallStatus.SUCCESS
                         elif tool_call["name"] == "generate_image":
                              # Special handling for image generation
@@ -481,40 +807,44 @@ class GeminiService:
                             if provider_name == "gemini":
                                 # Send a direct image generation request to Gemini
                                 image_prompt = f"Generate an image: {prompt}. Use your image generation capabilities to create this image now."
-                                image_response = await self._send_with_retry(chat_session, image_prompt)
+                                image_response = await self._send_with_retry(chat_session, image_prompt, session_id=session_id)
                                 
                                 # Check if images were generated
                                 if hasattr(image_response, 'images') and image_response.images:
                                     generated_urls = []
+                                    image_service = get_image_service(self.workspace_path)
                                     for img in image_response.images:
                                         img_url = getattr(img, 'url', '')
                                         if img_url:
                                             generated_urls.append(img_url)
+                                            seen_images.add(img_url)
                                             images.append(img_url)
-                                            # Track
-                                            img_type = "generated" if "generated" in type(img).__name__.lower() else "web"
-                                            image_service = get_image_service(self.workspace_path)
-                                            image_service.generated_images.append(ImageResult(
-                                                url=img_url,
-                                                image_type=ImageType.GENERATED if img_type == "generated" else ImageType.WEB,
-                                                title=getattr(img, 'title', None),
-                                                alt=getattr(img, 'alt', None)
-                                            ))
-                                            
-                                            # Save to project if requested
-                                            if save_to_project and self.workspace_path:
-                                                success, save_path = await image_service.save_image_from_url(
-                                                    img_url, filename
-                                                )
-                                                if success:
-                                                    tool_result = f"Image generated and saved to: {save_path}"
-                                                else:
-                                                    tool_result = f"Image generated but failed to save: {save_path}"
-                                            else:
-                                                tool_result = f"Image generated successfully. URL: {img_url[:50]}..."
-                                    
-                                    # Yield generated images
-                                    yield {"images": generated_urls}
+                                            self._track_image(image_service, img, img_url)
+
+                                    # Save to project if requested; downloads run concurrently
+                                    if save_to_project and self.workspace_path:
+                                        # Concurrent downloads must not share a target file
+                                        if filename and len(generated_urls) > 1:
+                                            stem, ext = os.path.splitext(filename)
+                                            filenames = [f"{stem}_{i}{ext}" for i in range(1, len(generated_urls) + 1)]
+                                        else:
+                                            filenames = [filename] * len(generated_urls)
+                                        saved = await self._interruptible(asyncio.gather(*(
+                                            image_service.save_image_from_url(img_url, img_filename)
+                                            for img_url, img_filename in zip(generated_urls, filenames)
+                                        )), session_id)
+                                        tool_result = "\n".join(
+                                            f"Image generated and saved to: {save_path}" if success
+                                            else f"Image generated but failed to save: {save_path}"
+                                            for success, save_path in saved
+                                        )
+                                    else:
+                                        tool_result = "\n".join(
+                                            f"Image generated successfully. URL: {img_url[:50]}..."
+                                            for img_url in generated_urls
+                                        )
+
+                                    result_chunk["images"] = generated_urls
                                     tool_status = ToolCallStatus.SUCCESS
                                     
                                     # Use image response as next response (skip iteration increment step logic? No, just replace response)
@@ -527,46 +857,35 @@ class GeminiService:
                                 tool_status = ToolCallStatus.ERROR
                         
                         else:
-                            tool_result, tool_status = await agent.execute_tool(
-                                tool_call["name"],
-                                tool_call["args"]
+                            tool_result, tool_status = await self._interruptible(
+                                agent.execute_tool(tool_call["name"], tool_call["args"]),
+                                session_id
                             )
 
-                        yield {"tool_result": tool_result}
+                        result_chunk["tool_result"] = tool_result
+                        yield result_chunk
                         message_parts.append({"type": "tool_result", "content": tool_result})
                         
-                        # Check interruption before next API call
-                        if self._is_interrupted(session_id):
-                            yield {"text": "\n\n*Agent interrupted by user.*", "is_final": True}
-                            break
-                        
                         # Prepare prompt for next iteration
                         current_prompt = tool_result
-                        iteration += 1
-                        
-                    except asyncio.CancelledError:
-                        yield {"text": "\n\n*Agent interrupted by user.*", "is_final": True}
-                        break
+
                     except Exception as e:
                         error_msg = f"Error executing '{tool_call['name']}': {str(e)}"
-                        yield {"tool_result": error_msg}
+                        result_chunk["tool_result"] = error_msg
+                        yield result_chunk
                         message_parts.append({"type": "tool_result", "content": error_msg})
                         
                         current_prompt = error_msg
-                        iteration += 1
-                
-                 # Check iteration limit
-                if iteration >= max_iterations:
-                    yield {
-                        "text": "\n\n*Agent reached maximum iterations. Task may be incomplete.*",
-                        "is_final": True
-                    }
+
+                else:
+                    # Loop ran out without a final answer
+                    yield self._final_chunk("\n\n*Agent reached maximum iterations. Task may be incomplete.*")
 
             else:
                  # Simple response (no workspace/agent)
                  # provider specific
                  if provider_name == "gemini":
-                     gemini_resp = await self._send_with_retry(chat_session, full_prompt, files=files)
+                     gemini_resp = await self._send_with_retry(chat_session, full_prompt, files=files, session_id=session_id)
                      response_text = gemini_resp.text or ""
                      api_thoughts = getattr(gemini_resp, 'thoughts', None) or ""
                      
@@ -577,10 +896,6 @@ class GeminiService:
                      if embedded_thinking:
                          all_thoughts = f"{all_thoughts}\n\n{embedded_thinking}".strip() if all_thoughts else embedded_thinking
                          
-                     if all_thoughts:
-                         yield {"thought": all_thoughts}
-                         message_parts.append({"type": "thought", "content": all_thoughts})
-                     
                      # Check images
                      if hasattr(gemini_resp, 'images') and gemini_resp.images:
                          for img in gemini_resp.images:
@@ -588,12 +903,16 @@ class GeminiService:
                             if img_url:
                                 images.append(img_url)
                      
-                     yield {"text": clean_text, "images": images, "is_final": True}
+                     final_chunk = self._final_chunk(clean_text, images)
+                     if all_thoughts:
+                         final_chunk["thought"] = all_thoughts
+                         message_parts.append({"type": "thought", "content": all_thoughts})
+                     yield final_chunk
                      message_parts.append({"type": "text", "content": clean_text})
                  else:
                     provider_service_inst = get_provider_service(provider_name)
                     if not provider_service_inst:
-                         yield {"error": f"Provider '{provider_name}' implementation not found.", "is_final": True}
+                         yield self._final_chunk(error=f"Provider '{provider_name}' implementation not found.")
                          return
                     
                     # Prepare message list
@@ -604,39 +923,64 @@ class GeminiService:
                         "proxy": self.config.get("proxy")
                     }
 
-                    accumulated_text = ""
                     accumulated_thought = ""
-                    async for chunk in provider_service_inst.generate_stream(messages, self.config.get("model", ""), **kwargs):
+                    thought_parser = self.thought_filter.stream_parser()
+                    coalescer = _StreamCoalescer()
+                    async for chunk in coalescer.paced(provider_service_inst.generate_stream(messages, self.config.get("model", ""), **kwargs), interrupt_event):
+                        if interrupt_event.is_set():
+                            raise asyncio.CancelledError()
+                        if not chunk:
+                            for out in coalescer.flush():
+                                yield out
+                            continue
                         if "error" in chunk:
+                            for out in coalescer.flush():
+                                yield out
                             yield {"error": chunk["error"]}
+                        if "usage" in chunk:
+                            prompt_cache_stats.record(chunk["usage"])
                         if "thought" in chunk:
                             accumulated_thought += chunk["thought"]
-                            yield {"thought": chunk["thought"]}
+                            for out in coalescer.add("thought", chunk["thought"]):
+                                yield out
                         if "text" in chunk:
-                            accumulated_text += chunk["text"]
-                            yield {"text": chunk["text"]}
-                    
+                            thought_delta, text_delta = thought_parser.feed(chunk["text"])
+                            for out in coalescer.add("thought", thought_delta) + coalescer.add("text", text_delta):
+                                yield out
+
+                    thought_delta, text_delta = thought_parser.finish()
+                    for out in coalescer.add("thought", thought_delta) + coalescer.add("text", text_delta) + coalescer.flush():
+                        yield out
+
+                    embedded_thinking, accumulated_text = thought_parser.result()
+                    if embedded_thinking:
+                        accumulated_thought = f"{accumulated_thought}\n\n{embedded_thinking}".strip()
                     if accumulated_thought:
                         message_parts.append({"type": "thought", "content": accumulated_thought})
                     message_parts.append({"type": "text", "content": accumulated_text})
-                    yield {"images": images, "is_final": True}
+                    yield self._final_chunk(images=images)
 
         except asyncio.CancelledError:
-            yield {"text": "\n\n*Agent interrupted by user.*", "is_final": True}
+            # The system prompt may not have reached the model
+            state.system_prompt = None
+            yield self._final_chunk("\n\n*Agent interrupted by user.*")
             message_parts.append({"type": "text", "content": "*Interrupted*"})
 
         except Exception as e:
+            state.system_prompt = None
             import traceback
             traceback.print_exc()
             error_msg = f"Error ({type(e).__name__}): {str(e)}"
-            yield {"error": error_msg, "is_final": True}
+            yield self._final_chunk(error=error_msg)
             message_parts.append({"type": "error", "content": error_msg})
             raise
 
         finally:
             # Clean up interrupted state
-            if session_id in self.interrupted_sessions:
-                self.interrupted_sessions.remove(session_id)
+            state.interrupt = None
+
+            if prompt_cache_stats.requests != cache_requests_before:
+                print(f"[GeminiService] Prompt cache: {prompt_cache_stats.summary()}")
 
             # Save AI message
             if session_id and message_parts:
@@ -675,10 +1019,8 @@ Execute this task autonomously and provide a complete summary of what you accomp
             
             if provider_name == "gemini":
                 client = await self.get_gemini_client()
-                model_name = self.config.get("model", "G_2_5_FLASH")
-                model = getattr(Model, model_name, Model.G_2_5_FLASH)
-                chat = client.start_chat(model=model)
-                response = await asyncio.wait_for(chat.send_message(prompt), timeout=120)
+                chat = client.start_chat(model=self.gemini_model)
+                response = await self._bounded_send(chat.send_message(prompt), GEMINI_SEND_TIMEOUT)
                 response_text = response.text or ""
             else:
                  # Minimal support for others in delegation
@@ -697,7 +1039,7 @@ Execute this task autonomously and provide a complete summary of what you accomp
                 )
                 
                 if provider_name == "gemini":
-                    response = await asyncio.wait_for(chat.send_message(tool_result), timeout=120)
+                    response = await self._bounded_send(chat.send_message(tool_result), GEMINI_SEND_TIMEOUT)
                     response_text = response.text or ""
                 else:
                     break
@@ -712,8 +1054,7 @@ Execute this task autonomously and provide a complete summary of what you accomp
     async def reset(self):
         """Reset the service (clear all sessions and agents)."""
         self.gemini_client = None
-        self.sessions = {}
-        self.provider_sessions = {}
-        self.agents = {}
-        self.interrupted_sessions.clear()
-        self.active_tasks.clear()
+        self.gemini_model = None
+        self._init_session_state()
+        for provider_cls in (DeepInfraProvider, QwenProvider, GradientProvider):
+            provider_cls.clear_models_cache()
@@ -3,6 +3,13 @@ import subprocess
 import json
 from typing import List, Dict, Optional
 
+# Path -> work tree root for paths already confirmed to be inside a repo.
+# Shared across instances since the routers create a GitManager per request.
+_repo_roots: Dict[str, str] = {}
+
+# Porcelain status codes to human readable names
+_STATUS_NAMES = {'M': 'modified', 'A': 'added', 'D': 'deleted', 'R': 'renamed', '?': 'untracked'}
+
 class GitManager:
     def __init__(self, workspace_path: str = None):
         self.workspace_path = workspace_path
@@ -33,7 +40,18 @@ class GitManager:
         path = path or self.workspace_path
         if not path or not os.path.exists(path):
             return False
-        res = self._run_git(['rev-parse', '--is-inside-work-tree'], cwd=path)
+
+        # A known repo only needs its .git entry to still exist, which is a
+        # stat instead of spawning git
+        root = _repo_roots.get(path)
+        if root is not None:
+            if os.path.exists(os.path.join(root, '.git')):
+                return True
+            del _repo_roots[path]
+
+        res = self._run_git(['rev-parse', '--show-toplevel'], cwd=path)
+        if res["success"] and res["stdout"]:
+            _repo_roots[path] = res["stdout"]
         return res["success"]
 
     def init_repo(self, path: str = None) -> str:
@@ -74,14 +92,13 @@ class GitManager:
             y = line[1] # Work tree status
             path = line[3:].strip()
             
-            # Map status codes to human readable
-            status_map = {'M': 'modified', 'A': 'added', 'D': 'deleted', 'R': 'renamed', '?': 'untracked'}
-            
-            if x in status_map:
-                staged.append({"path": path, "status": status_map[x]})
+            staged_status = _STATUS_NAMES.get(x)
+            if staged_status:
+                staged.append({"path": path, "status": staged_status})
             
-            if y in status_map:
-                unstaged.append({"path": path, "status": status_map[y]})
+            unstaged_status = _STATUS_NAMES.get(y)
+            if unstaged_status:
+                unstaged.append({"path": path, "status": unstaged_status})
                 
         return {"staged": staged, "unstaged": unstaged}
 
@@ -20,6 +20,10 @@ from dataclasses import dataclass
 from enum import Enum
 
 
+# File extensions accepted when deriving a filename from an image URL
+IMAGE_EXTENSIONS = frozenset({"png", "jpg", "jpeg", "gif", "webp", "svg"})
+
+
 class ImageType(Enum):
     """Type of image returned by Gemini."""
     GENERATED = "generated"  # AI-generated image
@@ -107,7 +111,7 @@ class ImageService:
                 ext = "png"
                 if "." in url.split("/")[-1]:
                     potential_ext = url.split(".")[-1].split("?")[0].lower()
-                    if potential_ext in ["png", "jpg", "jpeg", "gif", "webp", "svg"]:
+                    if potential_ext in IMAGE_EXTENSIONS:
                         ext = potential_ext
                 filename = self._generate_filename("image", ext)
 
@@ -323,7 +327,7 @@ Important: Use your image generation capabilities to CREATE a new, original imag
 
 
 # Tool function for agent integration
-async def generate_image_tool(
+def generate_image_tool(
     prompt: str,
     save_to_project: bool = False,
     filename: Optional[str] = None,
@@ -0,0 +1,67 @@
+"""
+Prompt Cache Statistics Module
+
+Accumulates provider-reported prompt caching usage so we can verify that the
+static system-prompt prefix is actually served from the provider's cache.
+Understands both usage shapes in the wild:
+- Anthropic style: cache_creation_input_tokens / cache_read_input_tokens
+- OpenAI style: prompt_tokens + prompt_tokens_details.cached_tokens
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Any
+
+
+@dataclass
+class PromptCacheStats:
+    """Running totals of prompt cache usage across requests."""
+    creation_tokens: int = 0
+    read_tokens: int = 0
+    prompt_tokens: int = 0
+    requests: int = 0
+    misses: int = 0
+
+    def record(self, usage: Dict[str, Any]) -> None:
+        """Accumulate one provider usage payload."""
+        if not isinstance(usage, dict):
+            return
+
+        details = usage.get("prompt_tokens_details") or {}
+        read = usage.get("cache_read_input_tokens") or details.get("cached_tokens") or 0
+        created = usage.get("cache_creation_input_tokens") or 0
+        # Anthropic reports uncached input separately from cached input
+        prompt = usage.get("prompt_tokens") or (usage.get("input_tokens", 0) + read + created)
+
+        self.requests += 1
+        self.read_tokens += read
+        self.creation_tokens += created
+        self.prompt_tokens += prompt
+        if not read:
+            self.misses += 1
+
+    @property
+    def hit_ratio(self) -> float:
+        """Fraction of prompt tokens that were served from cache."""
+        if not self.prompt_tokens:
+            return 0.0
+        return self.read_tokens / self.prompt_tokens
+
+    def summary(self) -> str:
+        """One-line summary for logging."""
+        return (
+            f"{self.hit_ratio:.0%} of {self.prompt_tokens} prompt tokens cached "
+            f"({self.requests} requests, {self.misses} misses, "
+            f"{self.creation_tokens} tokens written)"
+        )
+
+    def reset(self) -> None:
+        """Clear all counters."""
+        self.creation_tokens = 0
+        self.read_tokens = 0
+        self.prompt_tokens = 0
+        self.requests = 0
+        self.misses = 0
+
+
+# Process-wide instance updated by the provider response handling
+prompt_cache_stats = PromptCacheStats()
@@ -1,14 +1,25 @@
+from typing import Dict, Optional, Type
+
 from .deepinfra import DeepInfraProvider
 from .qwen import QwenProvider
 from .gradient import GradientProvider
 from .base import BaseProvider
 
-def get_provider_service(provider_name: str) -> BaseProvider:
-    if provider_name == "deepinfra":
-        return DeepInfraProvider()
-    elif provider_name == "qwen":
-        return QwenProvider()
-    elif provider_name == "gradient":
-        return GradientProvider()
-    else:
-        return None
+_PROVIDER_CLASSES: Dict[str, Type[BaseProvider]] = {
+    "deepinfra": DeepInfraProvider,
+    "qwen": QwenProvider,
+    "gradient": GradientProvider,
+}
+
+# Providers hold no per-request state, so one instance each is reused across
+# turns; this also keeps per-instance caches (e.g. Qwen's midtoken) warm
+_provider_instances: Dict[str, BaseProvider] = {}
+
+def get_provider_service(provider_name: str) -> Optional[BaseProvider]:
+    provider = _provider_instances.get(provider_name)
+    if provider is None:
+        provider_cls = _PROVIDER_CLASSES.get(provider_name)
+        if provider_cls is None:
+            return None
+        provider = _provider_instances[provider_name] = provider_cls()
+    return provider
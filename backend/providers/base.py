@@ -17,3 +17,8 @@ class BaseProvider(ABC):
     async def get_models(cls) -> List[Dict[str, Any]]:
         """Fetch available models for this provider."""
         return []
+
+    @classmethod
+    def clear_models_cache(cls) -> None:
+        """Drop any cached model list so the next get_models() refetches."""
+        pass
@@ -1,11 +1,14 @@
 import json
 import asyncio
-from typing import AsyncGenerator, Dict, Any, List
+from typing import AsyncGenerator, Dict, Any, List, Optional
 from curl_cffi.requests import AsyncSession
 from .base import BaseProvider
+from .. import fast_json
 
 class DeepInfraProvider(BaseProvider):
     URL = "https://api.deepinfra.com/v1/openai/chat/completions"
+    # Featured model list from the last successful fetch
+    _models_cache: Optional[List[Dict[str, Any]]] = None
     
     async def generate_stream(
         self,
@@ -35,7 +38,9 @@ class DeepInfraProvider(BaseProvider):
         payload = {
             "model": model,
             "messages": messages,
-            "stream": True
+            "stream": True,
+            # Ask for a final usage chunk so prompt cache hits can be tracked
+            "stream_options": {"include_usage": True}
         }
         
         proxy = kwargs.get("proxy")
@@ -64,7 +69,9 @@ class DeepInfraProvider(BaseProvider):
                             
                         if line.startswith('data: '):
                             try:
-                                data = json.loads(line[6:])
+                                data = fast_json.loads(line[6:])
+                                if data.get('usage'):
+                                    yield {"usage": data['usage']}
                                 choices = data.get('choices', [])
                                 if choices:
                                     delta = choices[0].get('delta', {})
@@ -81,16 +88,20 @@ class DeepInfraProvider(BaseProvider):
 
     @classmethod
     async def get_models(cls) -> List[Dict[str, Any]]:
+        if cls._models_cache is not None:
+            return cls._models_cache
+
         url = 'https://api.deepinfra.com/models/featured'
         try:
             async with AsyncSession(impersonate="chrome") as session:
                 resp = await session.get(url)
                 if resp.status_code == 200:
                     data = resp.json()
-                    return [
+                    cls._models_cache = [
                         {"id": m["model_name"], "name": m["model_name"].split("/")[-1]}
                         for m in data if m.get("type") == "text-generation"
                     ]
+                    return cls._models_cache
         except Exception:
             pass
         return [
@@ -98,3 +109,7 @@ class DeepInfraProvider(BaseProvider):
             {"id": "meta-llama/Meta-Llama-3-70B-Instruct", "name": "Llama 3 (70B)"},
             {"id": "mistralai/Mistral-7B-Instruct-v0.1", "name": "Mistral 7B"}
         ]
+
+    @classmethod
+    def clear_models_cache(cls) -> None:
+        cls._models_cache = None
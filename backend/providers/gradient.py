@@ -3,6 +3,7 @@ import asyncio
 from typing import AsyncGenerator, Dict, Any, List
 from curl_cffi.requests import AsyncSession
 from .base import BaseProvider
+from .. import fast_json
 
 class GradientProvider(BaseProvider):
     URL = "https://chat.gradient.network/api/generate"
@@ -59,7 +60,7 @@ class GradientProvider(BaseProvider):
                             continue
                             
                         try:
-                            data = json.loads(line)
+                            data = fast_json.loads(line)
                             msg_type = data.get("type")
                             
                             if msg_type == "reply":
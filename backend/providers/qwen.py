@@ -6,8 +6,12 @@ import asyncio
 from typing import AsyncGenerator, Dict, Any, List, Optional
 from curl_cffi.requests import AsyncSession
 from .base import BaseProvider
+from .. import fast_json
 from .qwen_utils.cookie_generator import generate_cookies
 
+# Midtoken embedded in the wu.json response
+_MIDTOKEN_RE = re.compile(r"(?:umx\.wu|__fycb)\('([^']+)'\)")
+
 class QwenProvider(BaseProvider):
     URL = "https://chat.qwen.ai"
     _midtoken: Optional[str] = None
@@ -22,7 +26,7 @@ class QwenProvider(BaseProvider):
             r = await session.get("https://sg-wum.alibaba.com/w/wu.json", proxy=proxy)
             if r.status_code == 200:
                 text = r.text
-                match = re.search(r"(?:umx\.wu|__fycb)\('([^']+)'\)", text)
+                match = _MIDTOKEN_RE.search(text)
                 if match:
                     self._midtoken = match.group(1)
                     self._midtoken_uses = 1
@@ -155,7 +159,7 @@ class QwenProvider(BaseProvider):
                                 break
                                 
                             try:
-                                chunk_data = json.loads(chunk_str)
+                                chunk_data = fast_json.loads(chunk_str)
                                 choices = chunk_data.get("choices", [])
                                 if not choices: continue
                                 
@@ -7,7 +7,7 @@ non-essential text that detracts from agentic behavior.
 """
 
 import re
-from typing import Tuple, Optional
+from typing import List, Pattern, Tuple, Optional
 
 # ============================================================================
 # URL PATTERNS TO FILTER
@@ -82,6 +82,13 @@ EMPTY_LIST_ITEMS = r'^[\s]*[-*+]\s*$'
 # Trailing/leading whitespace per line
 LINE_WHITESPACE = r'^[ \t]+|[ \t]+$'
 
+# Markdown links left empty once their URL is removed: [text]() and [](url)
+EMPTY_LINK_TARGET = r'\[([^\]]*)\]\(\s*\)'
+EMPTY_LINK_TEXT = r'\[\s*\]\([^)]*\)'
+
+# Sentences left ending in "check out" / "visit" once their link is removed
+DANGLING_LINK_PROMPT = r'(?:check out|visit|see|watch|read)\s*[.!?]?\s*$'
+
 
 class ResponseFilter:
     """
@@ -130,6 +137,9 @@ class ResponseFilter:
         self.multiple_newlines_regex = re.compile(MULTIPLE_NEWLINES)
         self.multiple_spaces_regex = re.compile(MULTIPLE_SPACES)
         self.empty_list_regex = re.compile(EMPTY_LIST_ITEMS, re.MULTILINE)
+        self.empty_link_target_regex = re.compile(EMPTY_LINK_TARGET)
+        self.empty_link_text_regex = re.compile(EMPTY_LINK_TEXT)
+        self.dangling_link_prompt_regex = re.compile(DANGLING_LINK_PROMPT, re.IGNORECASE | re.MULTILINE)
 
         # Tool call detection (to preserve)
         self.tool_call_regex = re.compile(
@@ -204,16 +214,11 @@ class ResponseFilter:
 
         # Clean up any resulting empty markdown links
         # [text]() or [](url) patterns
-        cleaned = re.sub(r'\[([^\]]*)\]\(\s*\)', r'\1', cleaned)
-        cleaned = re.sub(r'\[\s*\]\([^)]*\)', '', cleaned)
+        cleaned = self.empty_link_target_regex.sub(r'\1', cleaned)
+        cleaned = self.empty_link_text_regex.sub('', cleaned)
 
         # Clean up sentences that now end with "check out" or "visit" without a link
-        cleaned = re.sub(
-            r'(?:check out|visit|see|watch|read)\s*[.!?]?\s*$',
-            '.',
-            cleaned,
-            flags=re.IGNORECASE | re.MULTILINE
-        )
+        cleaned = self.dangling_link_prompt_regex.sub('.', cleaned)
 
         return cleaned
 
@@ -251,6 +256,18 @@ class ResponseFilter:
         return '\n'.join(lines)
 
 
+def strip_matches(regex: Pattern, text: str, captured: List[str], group: int = 1, strip: bool = False) -> str:
+    """
+    Remove every match of `regex` from `text`, appending each match's `group`
+    to `captured`. One scan does both, instead of finditer/findall plus sub.
+    """
+    def take(match):
+        value = match.group(group)
+        captured.append(value.strip() if strip else value)
+        return ''
+    return regex.sub(take, text)
+
+
 class ThoughtFilter:
     """
     Filters and extracts thinking/reasoning from AI responses.
@@ -297,30 +314,181 @@ class ThoughtFilter:
 
         thoughts = []
         clean_text = text
+        # Each pattern is skipped unless its opening marker occurs at all,
+        # which is the common case for plain replies
+        lower = text.lower()
 
         # Extract <think> blocks
-        for match in self.think_block_regex.finditer(text):
-            thoughts.append(match.group(1).strip())
-        clean_text = self.think_block_regex.sub('', clean_text)
+        if "<think>" in lower:
+            clean_text = strip_matches(self.think_block_regex, clean_text, thoughts, strip=True)
 
         # Extract [Thinking] blocks
-        for match in self.thinking_block_regex.finditer(clean_text):
-            thoughts.append(match.group(1).strip())
-        clean_text = self.thinking_block_regex.sub('', clean_text)
+        if "[thinking]" in lower:
+            clean_text = strip_matches(self.thinking_block_regex, clean_text, thoughts, strip=True)
 
         # Extract <internal> blocks
-        for match in self.internal_block_regex.finditer(clean_text):
-            thoughts.append(match.group(1).strip())
-        clean_text = self.internal_block_regex.sub('', clean_text)
+        if "<internal>" in lower:
+            clean_text = strip_matches(self.internal_block_regex, clean_text, thoughts, strip=True)
+
+        # A block still open at the end (the model hit its token limit
+        # mid-thought) is a thought running to the end of the text
+        if "<" in clean_text or "[" in clean_text:
+            unterminated = _OPEN_TAG_RE.search(clean_text)
+            if unterminated:
+                thoughts.append(clean_text[unterminated.end():].strip())
+                clean_text = clean_text[:unterminated.start()]
 
         # Extract inline thoughts
-        for match in self.inline_thought_regex.finditer(clean_text):
-            thoughts.append(match.group(0).strip())
-        clean_text = self.inline_thought_regex.sub('', clean_text)
+        if "*" in clean_text:
+            clean_text = strip_matches(self.inline_thought_regex, clean_text, thoughts, group=0, strip=True)
 
-        # Combine thoughts
-        combined_thoughts = '\n\n'.join(thoughts) if thoughts else None
+        # Combine thoughts (empty blocks contribute nothing, as in ThoughtStreamParser)
+        combined_thoughts = '\n\n'.join(t for t in thoughts if t) or None
+
+        return combined_thoughts, clean_text.strip()
+
+    def stream_parser(self) -> "ThoughtStreamParser":
+        """Create an incremental parser for a streamed response."""
+        return ThoughtStreamParser(self.inline_thought_regex)
+
+
+# Thinking block delimiters recognised by ThoughtStreamParser (matched case-insensitively)
+THOUGHT_BLOCK_TAGS = (
+    ("<think>", "</think>"),
+    ("[thinking]", "[/thinking]"),
+    ("<internal>", "</internal>"),
+)
+
+# Tags are located with IGNORECASE patterns on the original text rather than
+# in a lowercased copy: lowercasing can change the length of non-ASCII
+# characters (e.g. 'İ'), which would shift every index found after them.
+_OPEN_TAG_RE = re.compile(
+    "|".join(f"(?P<t{i}>{re.escape(open_tag)})" for i, (open_tag, _) in enumerate(THOUGHT_BLOCK_TAGS)),
+    re.IGNORECASE
+)
+_CLOSE_TAG_RES = {
+    f"t{i}": (re.compile(re.escape(close_tag), re.IGNORECASE), close_tag)
+    for i, (_, close_tag) in enumerate(THOUGHT_BLOCK_TAGS)
+}
+
+
+class ThoughtStreamParser:
+    """
+    Incrementally separates thinking blocks from a streamed response.
 
+    Each chunk is scanned once: feed() only looks at the new text plus the
+    few characters held back because they might be the start of a tag, so a
+    long response costs O(n) overall instead of rescanning the whole buffer.
+    """
+
+    def __init__(self, inline_thought_regex):
+        self._inline_thought_regex = inline_thought_regex
+        self._pending = ""
+        self._close_re: Optional[Pattern] = None
+        self._close_tag: Optional[str] = None
+        self._thoughts = []
+        self._current_thought = []
+        self._text = []
+
+    @staticmethod
+    def _partial_tag_len(text: str, tags) -> int:
+        """Length of the longest suffix of `text` that could start one of `tags`."""
+        longest = 0
+        for tag in tags:
+            for size in range(min(len(tag) - 1, len(text)), longest, -1):
+                # Only the short suffix is lowercased, and only for comparison
+                if tag.startswith(text[-size:].lower()):
+                    longest = size
+                    break
+        return longest
+
+    def feed(self, chunk: str) -> Tuple[str, str]:
+        """
+        Consume a chunk of streamed text.
+
+        Returns:
+            Tuple of (thought_delta, text_delta) ready to be streamed
+        """
+        self._pending += chunk
+        thought_out = []
+        text_out = []
+
+        while self._pending:
+            if self._close_re is None:
+                match = _OPEN_TAG_RE.search(self._pending)
+                if match is None:
+                    keep = self._partial_tag_len(self._pending, (tag for tag, _ in THOUGHT_BLOCK_TAGS))
+                    split = len(self._pending) - keep
+                    text_out.append(self._pending[:split])
+                    self._pending = self._pending[split:]
+                    break
+
+                text_out.append(self._pending[:match.start()])
+                self._close_re, self._close_tag = _CLOSE_TAG_RES[match.lastgroup]
+                self._pending = self._pending[match.end():]
+            else:
+                match = self._close_re.search(self._pending)
+                if match is None:
+                    keep = self._partial_tag_len(self._pending, (self._close_tag,))
+                    split = len(self._pending) - keep
+                    thought_out.append(self._pending[:split])
+                    self._current_thought.append(self._pending[:split])
+                    self._pending = self._pending[split:]
+                    break
+
+                thought_out.append(self._pending[:match.start()])
+                self._current_thought.append(self._pending[:match.start()])
+                self._end_thought()
+                self._pending = self._pending[match.end():]
+                self._close_re = self._close_tag = None
+
+        text_delta = "".join(text_out)
+        if text_delta:
+            self._text.append(text_delta)
+        return "".join(thought_out), text_delta
+
+    def _end_thought(self):
+        thought = "".join(self._current_thought).strip()
+        if thought:
+            self._thoughts.append(thought)
+        self._current_thought = []
+
+    def finish(self) -> Tuple[str, str]:
+        """
+        Flush text held back at the end of the stream.
+
+        An unterminated thinking block stays a thought, as in
+        ThoughtFilter.extract_thoughts: its content has already been streamed
+        on the thought channel and is not sent again as text.
+
+        Returns:
+            Tuple of (thought_delta, text_delta)
+        """
+        remainder, self._pending = self._pending, ""
+        if self._close_re is not None:
+            self._current_thought.append(remainder)
+            self._end_thought()
+            self._close_re = self._close_tag = None
+            return remainder, ""
+        if remainder:
+            self._text.append(remainder)
+        return "", remainder
+
+    def result(self) -> Tuple[Optional[str], str]:
+        """
+        Thoughts and clean text for everything fed so far.
+
+        Returns the same shape as ThoughtFilter.extract_thoughts.
+        """
+        thoughts = list(self._thoughts)
+        clean_text = "".join(self._text)
+
+        if "*" in clean_text:
+            for match in self._inline_thought_regex.finditer(clean_text):
+                thoughts.append(match.group(0).strip())
+            clean_text = self._inline_thought_regex.sub('', clean_text)
+
+        combined_thoughts = '\n\n'.join(thoughts) if thoughts else None
         return combined_thoughts, clean_text.strip()
 
 
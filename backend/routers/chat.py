@@ -5,12 +5,15 @@ import shutil
 import time
 import tempfile
 import json
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, Response
 from ..storage import save_chat_message, get_chat_history, get_all_chats, delete_chat, get_workspace as get_workspace_data
 # We'll need access to GeminiService instance
 
 router = APIRouter()
 
+# The Gemini model list is static, so its response body is encoded once
+_GEMINI_MODELS_JSON = json.dumps([{"id": "G_2_5_FLASH", "name": "Agent Flashy"}]).encode("utf-8")
+
 # Use system temp directory
 UPLOAD_DIR = os.path.join(tempfile.gettempdir(), "flashy_uploads")
 if not os.path.exists(UPLOAD_DIR):
@@ -45,7 +48,7 @@ async def get_models(request: Request):
     provider_name = service.get_active_provider()
     
     if provider_name == "gemini":
-        return [{"id": "G_2_5_FLASH", "name": "Agent Flashy"}]
+        return Response(content=_GEMINI_MODELS_JSON, media_type="application/json")
     
     from ..providers import get_provider_service
     provider_inst = get_provider_service(provider_name)
@@ -10,14 +10,33 @@ WORKSPACES_FILE = os.path.join(DATA_DIR, "workspaces.json")
 if not os.path.exists(DATA_DIR):
     os.makedirs(DATA_DIR)
 
+# filepath -> ((mtime_ns, size), parsed data). chats.json is re-read on every
+# message and metadata lookup, so it is only parsed again when the file changes.
+# Callers that mutate the returned dict always save it, which refreshes the entry.
+_json_cache = {}
+
+def _file_signature(filepath):
+    st = os.stat(filepath)
+    return st.st_mtime_ns, st.st_size
+
 def load_json(filepath):
-    if not os.path.exists(filepath):
+    try:
+        signature = _file_signature(filepath)
+    except FileNotFoundError:
+        _json_cache.pop(filepath, None)
         return {}
+
+    cached = _json_cache.get(filepath)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
     with open(filepath, "r", encoding="utf-8") as f:
         try:
-            return json.load(f)
+            data = json.load(f)
         except:
             return {}
+    _json_cache[filepath] = (signature, data)
+    return data
 
 def save_json(filepath, data):
     """Save data to a JSON file atomically."""
@@ -34,7 +53,9 @@ def save_json(filepath, data):
         # Atomically rename the temporary file to the target file
         # This replaces the target file if it exists
         os.replace(temp_path, filepath)
+        _json_cache[filepath] = (_file_signature(filepath), data)
     except Exception as e:
+        _json_cache.pop(filepath, None)
         print(f"Error saving JSON to {filepath}: {e}")
         if os.path.exists(temp_path):
             os.remove(temp_path)
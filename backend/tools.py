@@ -1,11 +1,72 @@
 import os
+import re
+import asyncio
+import inspect
 import subprocess
 import glob
-from typing import Optional, List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import Optional, List, Dict, Any, Callable
 from .git_manager import GitManager
 from .websocket_manager import ws_manager
 from .image_service import get_image_service, ImageService
 
+# Runs of blank lines collapsed in fetched page text
+_BLANK_LINES_RE = re.compile(r'\n\s*\n')
+
+# Synchronous tools (file I/O, git subprocesses, web fetches) run here so a slow
+# call doesn't stall every other session on the event loop
+_TOOL_EXECUTOR = ThreadPoolExecutor(
+    max_workers=min(32, (os.cpu_count() or 1) * 4),
+    thread_name_prefix="flashy-tool"
+)
+
+# Directories skipped by grep_search and the explorer tree
+_GREP_EXCLUDED_DIRS = frozenset({'.git', 'node_modules', '__pycache__', 'venv', '.venv'})
+_EXPLORER_EXCLUDED_DIRS = frozenset({'.git', 'node_modules', '__pycache__'})
+
+# Manifests reported by get_dependencies, in display order
+_DEPENDENCY_FILES = ("package.json", "requirements.txt", "pyproject.toml", "go.mod", "Cargo.toml")
+
+# Sync tools that only build a string; called inline, a thread hop costs more than they do
+_INLINE_TOOLS = frozenset({"generate_image"})
+
+# Tool catalogue shown to the model; fixed, so built once at import
+_TOOL_SCHEMA = (
+    {"name": "read_file", "description": "Read file contents. Args: path (str)"},
+    {"name": "read_files", "description": "Read multiple files. Args: paths (list[str]), max_bytes (int, optional)"},
+    {"name": "write_file", "description": "Write/create file. Args: path (str), content (str)"},
+    {"name": "write_files", "description": "Write multiple files. Args: files (list of {path, content})"},
+    {"name": "patch_file", "description": "Replace a specific block of text. Args: path (str), target (str), replacement (str)"},
+    {"name": "apply_patch", "description": "Apply a unified diff patch. Args: patch (str)"},
+    {"name": "list_dir", "description": "List directory contents. Args: path (str, optional)"},
+    {"name": "get_file_tree", "description": "Get recursive tree view text. Args: path (str, optional), max_depth (int, default 2)"},
+    {"name": "get_explorer_data", "description": "Get recursive directory structure as JSON for UI. Args: path (str, optional)"},
+    {"name": "search_files", "description": "Search for files by name pattern. Args: pattern (str), path (str, optional)"},
+    {"name": "grep_search", "description": "Search for text inside files. Args: query (str), path (str, optional), extensions (list, optional)"},
+    {"name": "run_command", "description": "Execute shell command. Args: command (str), cwd (str, optional)"},
+    {"name": "delete_path", "description": "Delete file/directory. Args: path (str)"},
+    {"name": "get_dependencies", "description": "Analyze project dependencies. No args."},
+    {"name": "web_search", "description": "Search the web. Args: query (str)"},
+    {"name": "web_browse", "description": "Browse a website. Args: url (str)"},
+    {"name": "get_symbol_info", "description": "Find definition of a symbol. Args: symbol_name (str)"},
+    {"name": "git_status", "description": "Get git status. No args."},
+    {"name": "git_commit", "description": "Commit all changes. Args: message (str)"},
+    {"name": "git_push", "description": "Push changes. Args: remote (str, optional), branch (str, optional)"},
+    {"name": "git_pull", "description": "Pull changes. Args: remote (str, optional), branch (str, optional)"},
+    {"name": "git_branches", "description": "List all branches. No args."},
+    {"name": "git_checkout", "description": "Switch/create branch. Args: branch (str), create (bool, optional)"},
+    {"name": "git_log", "description": "Show commit history. Args: limit (int, optional)"},
+    {"name": "git_clone", "description": "Clone a repo. Args: url (str), path (str, optional)"},
+    {"name": "git_init", "description": "Initialize a new git repo. No args."},
+    # Image Tools
+    {"name": "generate_image", "description": "Generate an AI image. Args: prompt (str), save_to_project (bool, optional), filename (str, optional)"},
+    {"name": "save_image", "description": "Save image from URL to project. Args: url (str), filename (str, optional), subdir (str, optional)"},
+    {"name": "save_generated_images", "description": "Save all recently generated images. Args: subdir (str, optional)"},
+)
+
+
 class Tools:
     """Collection of tools the agent can use to interact with the local system."""
     
@@ -13,17 +74,64 @@ class Tools:
         self.workspace_path = workspace_path or os.getcwd()
         self.session_id = session_id
         self.git = GitManager(self.workspace_path)
-        self.image_service = get_image_service(self.workspace_path)
+        # Resolved on first image tool call; most sessions never touch images
+        self._image_service: Optional[ImageService] = None
         
         # Track pending image operations
         self._pending_image_save: Dict[str, Any] = {}
+
+        # Tool name -> bound method, built once for execute()
+        self._tool_map: Dict[str, Callable] = {
+            # File System Tools
+            "read_file": self.read_file,
+            "read_files": self.read_files,
+            "write_file": self.write_file,
+            "write_files": self.write_files,
+            "patch_file": self.patch_file,
+            "apply_patch": self.apply_patch,
+            "list_dir": self.list_dir,
+            "get_file_tree": self.get_file_tree,
+            "get_explorer_data": self.get_explorer_data,
+            "search_files": self.search_files,
+            "grep_search": self.grep_search,
+            "run_command": self.run_command,
+            "delete_path": self.delete_path,
+            # Analysis Tools
+            "get_dependencies": self.get_dependencies,
+            "get_symbol_info": self.get_symbol_info,
+            # Web Tools
+            "web_search": self.web_search,
+            "web_browse": self.web_browse,
+            # Git Tools
+            "git_status": self.git_status,
+            "git_commit": self.git_commit,
+            "git_push": self.git_push,
+            "git_pull": self.git_pull,
+            "git_branches": self.git_branches,
+            "git_checkout": self.git_checkout,
+            "git_log": self.git_log,
+            "git_clone": self.git_clone,
+            "git_init": self.git_init,
+            # Image Tools
+            "generate_image": self.generate_image,
+            "save_image": self.save_image,
+            "save_generated_images": self.save_generated_images,
+        }
     
+    @property
+    def image_service(self) -> ImageService:
+        """Shared image service, pointed at this workspace on first use."""
+        if self._image_service is None:
+            self._image_service = get_image_service(self.workspace_path)
+        return self._image_service
+
     def set_workspace(self, path: str):
         """Set the workspace root path."""
         if os.path.isdir(path):
             self.workspace_path = os.path.abspath(path)
             self.git.workspace_path = self.workspace_path
-            self.image_service.set_workspace(self.workspace_path)
+            if self._image_service is not None:
+                self._image_service.set_workspace(self.workspace_path)
             return f"Workspace set to: {self.workspace_path}"
         else:
             return f"Error: '{path}' is not a valid directory."
@@ -156,9 +264,11 @@ class Tools:
             full_path = self._resolve_path(path)
             if not os.path.isdir(full_path):
                 return f"Error: '{path}' is not a directory."
-            items = os.listdir(full_path)
-            dirs = sorted([f"📁 {item}/" for item in items if os.path.isdir(os.path.join(full_path, item))])
-            files = sorted([f"📄 {item}" for item in items if os.path.isfile(os.path.join(full_path, item))])
+            # scandir entries carry the file type, so no extra stat per item
+            with os.scandir(full_path) as it:
+                entries = list(it)
+            dirs = sorted([f"📁 {entry.name}/" for entry in entries if entry.is_dir()])
+            files = sorted([f"📄 {entry.name}" for entry in entries if entry.is_file()])
             result = "\n".join(dirs + files)
             return f"Contents of {path}:\n{result}" if result else f"{path} is empty."
         except FileNotFoundError:
@@ -176,15 +286,16 @@ class Tools:
             def _build_tree(current_path, current_depth):
                 if current_depth > max_depth:
                     return
+                prefix = "  " * current_depth + "└── "
                 try:
-                    items = os.listdir(current_path)
-                    for i, item in enumerate(sorted(items)):
-                        item_path = os.path.join(current_path, item)
-                        is_dir = os.path.isdir(item_path)
-                        prefix = "  " * current_depth + "└── "
-                        result.append(f"{prefix}{item}{'/' if is_dir else ''}")
-                        if is_dir:
-                            _build_tree(item_path, current_depth + 1)
+                    with os.scandir(current_path) as it:
+                        entries = sorted(it, key=lambda entry: entry.name)
+                    for entry in entries:
+                        if entry.is_dir():
+                            result.append(prefix + entry.name + "/")
+                            _build_tree(entry.path, current_depth + 1)
+                        else:
+                            result.append(prefix + entry.name)
                 except PermissionError:
                     result.append("  " * current_depth + "└── [Permission Denied]")
 
@@ -213,20 +324,23 @@ class Tools:
             path = path or "."
             full_path = self._resolve_path(path)
             results = []
+            # Case-insensitive match without lower-casing every line
+            matcher = re.compile(re.escape(query), re.IGNORECASE)
+            suffixes = tuple(extensions) if extensions else None
             
             for root, dirs, files in os.walk(full_path):
-                if any(exclude in root for exclude in ['.git', 'node_modules', '__pycache__', 'venv']):
-                    continue
+                # Prune in place so excluded trees are never walked at all
+                dirs[:] = [d for d in dirs if d not in _GREP_EXCLUDED_DIRS]
                     
                 for file in files:
-                    if extensions and not any(file.endswith(ext) for ext in extensions):
+                    if suffixes and not file.endswith(suffixes):
                         continue
                         
                     file_path = os.path.join(root, file)
                     try:
                         with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
                             for line_num, line in enumerate(f, 1):
-                                if query.lower() in line.lower():
+                                if matcher.search(line):
                                     rel_path = os.path.relpath(file_path, self.workspace_path)
                                     results.append(f"{rel_path}:{line_num}: {line.strip()}")
                                     if len(results) >= 50:
@@ -310,7 +424,7 @@ class Tools:
                         # Sort: directories first, then alphabetical
                         entries = sorted(os.listdir(current_full_path))
                         for entry in entries:
-                            if entry in ['.git', 'node_modules', '__pycache__']: continue
+                            if entry in _EXPLORER_EXCLUDED_DIRS: continue
                             child_full_path = os.path.join(current_full_path, entry)
                             item["children"].append(_scan(child_full_path))
                         
@@ -328,9 +442,7 @@ class Tools:
     def get_dependencies(self) -> str:
         """Analyze project dependencies (package.json, requirements.txt, etc.)."""
         results = []
-        files_to_check = ["package.json", "requirements.txt", "pyproject.toml", "go.mod", "Cargo.toml"]
-        
-        for file in files_to_check:
+        for file in _DEPENDENCY_FILES:
             full_path = self._resolve_path(file)
             if os.path.exists(full_path):
                 try:
@@ -351,16 +463,17 @@ class Tools:
             # DuckDuckGo HTML version (simpler to parse)
             url = f"https://html.duckduckgo.com/html/?q={query}"
             resp = session.get(url)
-            results = []
-            for item in resp.html.find('.result'):
-                title_node = item.find('.result__a', first=True)
-                snippet_node = item.find('.result__snippet', first=True)
-                if title_node and snippet_node:
-                    results.append(f"Title: {title_node.text}\nLink: {title_node.attrs['href']}\nSnippet: {snippet_node.text}\n")
-            
-            if results:
-                return "\n".join(results[:8])
-            return "No web results found."
+            nodes = (
+                (item.find('.result__a', first=True), item.find('.result__snippet', first=True))
+                for item in resp.html.find('.result')
+            )
+            # Lazily formatted, so only the 8 results returned are ever built
+            results = (
+                f"Title: {title_node.text}\nLink: {title_node.attrs['href']}\nSnippet: {snippet_node.text}\n"
+                for title_node, snippet_node in nodes
+                if title_node and snippet_node
+            )
+            return "\n".join(islice(results, 8)) or "No web results found."
         except Exception as e:
             return f"Error during web search: {str(e)}"
 
@@ -373,8 +486,7 @@ class Tools:
             # Basic text extraction
             text = resp.html.text
             # Clean up excessive whitespace
-            import re
-            text = re.sub(r'\n\s*\n', '\n\n', text)
+            text = _BLANK_LINES_RE.sub('\n\n', text)
             return f"Content of {url}:\n\n{text[:10000]}..." # Cap at 10k chars
         except Exception as e:
             return f"Error browsing {url}: {str(e)}"
@@ -389,15 +501,10 @@ class Tools:
             f"const {symbol_name}",
             f"function {symbol_name}"
         ]
-        results = []
-        for pattern in patterns:
-            res = self.grep_search(pattern)
-            if "Search results" in res:
-                results.append(res)
-        
-        if results:
-            return "\n\n".join(results)
-        return f"Could not find any clear definitions for '{symbol_name}'."
+        found = "\n\n".join(
+            res for res in map(self.grep_search, patterns) if "Search results" in res
+        )
+        return found or f"Could not find any clear definitions for '{symbol_name}'."
 
     # --- Image Tools ---
 
@@ -482,11 +589,11 @@ Please generate an image matching this description. Use your image generation ca
         
         output = []
         if saved:
-            output.append("Saved images:\\n" + "\\n".join(saved))
+            output.append("Saved images:\n" + "\n".join(saved))
         if errors:
-            output.append("Errors:\\n" + "\\n".join(errors))
+            output.append("Errors:\n" + "\n".join(errors))
         
-        return "\\n\\n".join(output) if output else "No images to save."
+        return "\n\n".join(output) if output else "No images to save."
 
     def get_pending_image_save(self) -> Dict[str, Any]:
         """Get and clear pending image save request."""
@@ -529,7 +636,7 @@ Please generate an image matching this description. Use your image generation ca
         if not self.git.is_repo():
             return "Error: Not a git repository."
         branches = self.git.get_branches()
-        return "\n".join([f"{'* ' if b['current'] else '  '}{b['name']}" for b in branches])
+        return "\n".join(('* ' if b['current'] else '  ') + b['name'] for b in branches)
 
     def git_checkout(self, branch: str, create: bool = False) -> str:
         """Switch to a branch or create a new one."""
@@ -558,88 +665,21 @@ Please generate an image matching this description. Use your image generation ca
 
     def get_available_tools(self) -> list:
         """Return list of available tools with descriptions."""
-        return [
-            {"name": "read_file", "description": "Read file contents. Args: path (str)"},
-            {"name": "read_files", "description": "Read multiple files. Args: paths (list[str]), max_bytes (int, optional)"},
-            {"name": "write_file", "description": "Write/create file. Args: path (str), content (str)"},
-            {"name": "write_files", "description": "Write multiple files. Args: files (list of {path, content})"},
-            {"name": "patch_file", "description": "Replace a specific block of text. Args: path (str), target (str), replacement (str)"},
-            {"name": "apply_patch", "description": "Apply a unified diff patch. Args: patch (str)"},
-            {"name": "list_dir", "description": "List directory contents. Args: path (str, optional)"},
-            {"name": "get_file_tree", "description": "Get recursive tree view text. Args: path (str, optional), max_depth (int, default 2)"},
-            {"name": "get_explorer_data", "description": "Get recursive directory structure as JSON for UI. Args: path (str, optional)"},
-            {"name": "search_files", "description": "Search for files by name pattern. Args: pattern (str), path (str, optional)"},
-            {"name": "grep_search", "description": "Search for text inside files. Args: query (str), path (str, optional), extensions (list, optional)"},
-            {"name": "run_command", "description": "Execute shell command. Args: command (str), cwd (str, optional)"},
-            {"name": "delete_path", "description": "Delete file/directory. Args: path (str)"},
-            {"name": "get_dependencies", "description": "Analyze project dependencies. No args."},
-            {"name": "web_search", "description": "Search the web. Args: query (str)"},
-            {"name": "web_browse", "description": "Browse a website. Args: url (str)"},
-            {"name": "get_symbol_info", "description": "Find definition of a symbol. Args: symbol_name (str)"},
-            {"name": "git_status", "description": "Get git status. No args."},
-            {"name": "git_commit", "description": "Commit all changes. Args: message (str)"},
-            {"name": "git_push", "description": "Push changes. Args: remote (str, optional), branch (str, optional)"},
-            {"name": "git_pull", "description": "Pull changes. Args: remote (str, optional), branch (str, optional)"},
-            {"name": "git_branches", "description": "List all branches. No args."},
-            {"name": "git_checkout", "description": "Switch/create branch. Args: branch (str), create (bool, optional)"},
-            {"name": "git_log", "description": "Show commit history. Args: limit (int, optional)"},
-            {"name": "git_clone", "description": "Clone a repo. Args: url (str), path (str, optional)"},
-            {"name": "git_init", "description": "Initialize a new git repo. No args."},
-            # Image Tools
-            {"name": "generate_image", "description": "Generate an AI image. Args: prompt (str), save_to_project (bool, optional), filename (str, optional)"},
-            {"name": "save_image", "description": "Save image from URL to project. Args: url (str), filename (str, optional), subdir (str, optional)"},
-            {"name": "save_generated_images", "description": "Save all recently generated images. Args: subdir (str, optional)"}
-        ]
+        return list(_TOOL_SCHEMA)
     
     async def execute(self, tool_name: str, **kwargs) -> str:
         """Execute a tool by name with given arguments."""
-        tool_map = {
-            # File System Tools
-            "read_file": self.read_file,
-            "read_files": self.read_files,
-            "write_file": self.write_file,
-            "write_files": self.write_files,
-            "patch_file": self.patch_file,
-            "apply_patch": self.apply_patch,
-            "list_dir": self.list_dir,
-            "get_file_tree": self.get_file_tree,
-            "get_explorer_data": self.get_explorer_data,
-            "search_files": self.search_files,
-            "grep_search": self.grep_search,
-            "run_command": self.run_command,
-            "delete_path": self.delete_path,
-            # Analysis Tools
-            "get_dependencies": self.get_dependencies,
-            "get_symbol_info": self.get_symbol_info,
-            # Web Tools
-            "web_search": self.web_search,
-            "web_browse": self.web_browse,
-            # Git Tools
-            "git_status": self.git_status,
-            "git_commit": self.git_commit,
-            "git_push": self.git_push,
-            "git_pull": self.git_pull,
-            "git_branches": self.git_branches,
-            "git_checkout": self.git_checkout,
-            "git_log": self.git_log,
-            "git_clone": self.git_clone,
-            "git_init": self.git_init,
-            # Image Tools
-            "generate_image": self.generate_image,
-            "save_image": self.save_image,
-            "save_generated_images": self.save_generated_images,
-        }
-        
-        if tool_name not in tool_map:
-            return f"Error: Unknown tool '{tool_name}'. Available: {list(tool_map.keys())}"
+        func = self._tool_map.get(tool_name)
+        if func is None:
+            return f"Error: Unknown tool '{tool_name}'. Available: {list(self._tool_map.keys())}"
         
         try:
-            func = tool_map[tool_name]
-            import inspect
             if inspect.iscoroutinefunction(func):
                 return await func(**kwargs)
-            else:
+            if tool_name in _INLINE_TOOLS:
                 return func(**kwargs)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(_TOOL_EXECUTOR, partial(func, **kwargs))
         except TypeError as e:
             return f"Error: Invalid arguments for '{tool_name}': {str(e)}"
         except KeyError as e:
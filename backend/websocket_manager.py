@@ -6,6 +6,7 @@ Handles real-time bidirectional communication between frontend and backend.
 import asyncio
 import json
 import time
+import weakref
 from typing import Dict, Set, Optional, Callable, Any
 from fastapi import WebSocket, WebSocketDisconnect
 from dataclasses import dataclass, field
@@ -64,8 +65,11 @@ class WebSocketManager:
         self.terminal_subscribers: Dict[str, Set[str]] = {}
         # Running terminals: terminal_id -> asyncio.subprocess.Process
         self.terminals: Dict[str, asyncio.subprocess.Process] = {}
-        # session_id -> asyncio.Task (running agent task)
-        self.active_agent_tasks: Dict[str, asyncio.Task] = {}
+        # session_id -> asyncio.Task (running agent task); weak, so finished
+        # tasks and the frames they close over are freed without cleanup
+        self.active_agent_tasks: "weakref.WeakValueDictionary[str, asyncio.Task]" = weakref.WeakValueDictionary()
+        # Strong refs for agent tasks while they run (the event loop only keeps weak ones)
+        self._running_agent_tasks: Set[asyncio.Task] = set()
         # session_id -> asyncio.Lock (ensure one task at a time)
         self.session_locks: Dict[str, asyncio.Lock] = {}
         self._connection_counter = 0
@@ -76,9 +80,10 @@ class WebSocketManager:
 
     def get_session_lock(self, session_id: str) -> asyncio.Lock:
         """Get or create a lock for a session."""
-        if session_id not in self.session_locks:
-            self.session_locks[session_id] = asyncio.Lock()
-        return self.session_locks[session_id]
+        lock = self.session_locks.get(session_id)
+        if lock is None:
+            lock = self.session_locks[session_id] = asyncio.Lock()
+        return lock
 
     async def connect(self, websocket: WebSocket, session_id: str = None, workspace_id: str = None) -> str:
         """Accept a new WebSocket connection."""
@@ -92,38 +97,37 @@ class WebSocketManager:
         )
         
         if session_id:
-            if session_id not in self.session_connections:
-                self.session_connections[session_id] = set()
-            self.session_connections[session_id].add(connection_id)
+            self.session_connections.setdefault(session_id, set()).add(connection_id)
         
         print(f"[WS] Connection {connection_id} established (session: {session_id})")
         return connection_id
 
     async def disconnect(self, connection_id: str):
         """Handle WebSocket disconnection."""
-        if connection_id not in self.connections:
+        conn = self.connections.pop(connection_id, None)
+        if conn is None:
             return
         
-        conn = self.connections[connection_id]
         session_id = conn.session_id
         
         # Remove from session tracking
-        if session_id and session_id in self.session_connections:
-            self.session_connections[session_id].discard(connection_id)
+        session_conns = self.session_connections.get(session_id) if session_id else None
+        if session_conns is not None:
+            session_conns.discard(connection_id)
             
             # If this was the last connection for this session, 
             # we might want to stop the agent task after a short grace period
-            if not self.session_connections[session_id]:
+            if not session_conns:
                 del self.session_connections[session_id]
                 # Trigger a delayed check to see if we should kill the task
                 asyncio.create_task(self._check_cleanup_session_task(session_id))
         
         # Remove from terminal subscriptions
         for terminal_id in conn.subscribed_terminals:
-            if terminal_id in self.terminal_subscribers:
-                self.terminal_subscribers[terminal_id].discard(connection_id)
+            subscribers = self.terminal_subscribers.get(terminal_id)
+            if subscribers is not None:
+                subscribers.discard(connection_id)
         
-        del self.connections[connection_id]
         print(f"[WS] Connection {connection_id} closed")
 
     async def _check_cleanup_session_task(self, session_id: str):
@@ -133,20 +137,19 @@ class WebSocketManager:
         """
         await asyncio.sleep(10)  # 10s grace period for refresh/reconnect
         if session_id not in self.session_connections:
-            if session_id in self.active_agent_tasks:
-                task = self.active_agent_tasks[session_id]
-                if not task.done():
-                    task.cancel()
-                    print(f"[WS] Cancelled abandoned task for session {session_id}")
-                del self.active_agent_tasks[session_id]
+            task = self.active_agent_tasks.pop(session_id, None)
+            if task is not None and not task.done():
+                task.cancel()
+                print(f"[WS] Cancelled abandoned task for session {session_id}")
 
     async def send_to_connection(self, connection_id: str, message_type: MessageType, data: dict):
         """Send a message to a specific connection."""
-        if connection_id not in self.connections:
+        conn = self.connections.get(connection_id)
+        if conn is None:
             return
         
         try:
-            await self.connections[connection_id].websocket.send_json({
+            await conn.websocket.send_json({
                 "type": message_type.value,
                 **data
             })
@@ -156,21 +159,21 @@ class WebSocketManager:
 
     async def send_to_session(self, session_id: str, message_type: MessageType, data: dict):
         """Broadcast a message to all connections in a session."""
-        if session_id not in self.session_connections:
+        connection_ids = self.session_connections.get(session_id)
+        if not connection_ids:
             return
         
         # Copy set to avoid modification during iteration
-        connection_ids = list(self.session_connections.get(session_id, set()))
-        for connection_id in connection_ids:
+        for connection_id in list(connection_ids):
             await self.send_to_connection(connection_id, message_type, data)
 
     async def broadcast_terminal_output(self, terminal_id: str, output: str, is_error: bool = False):
         """Send terminal output to all subscribed connections."""
-        if terminal_id not in self.terminal_subscribers:
+        connection_ids = self.terminal_subscribers.get(terminal_id)
+        if not connection_ids:
             return
         
-        connection_ids = list(self.terminal_subscribers.get(terminal_id, set()))
-        for connection_id in connection_ids:
+        for connection_id in list(connection_ids):
             await self.send_to_connection(
                 connection_id,
                 MessageType.TERMINAL_OUTPUT,
@@ -182,10 +185,7 @@ class WebSocketManager:
         if connection_id not in self.connections:
             return
         
-        if terminal_id not in self.terminal_subscribers:
-            self.terminal_subscribers[terminal_id] = set()
-        
-        self.terminal_subscribers[terminal_id].add(connection_id)
+        self.terminal_subscribers.setdefault(terminal_id, set()).add(connection_id)
         self.connections[connection_id].subscribed_terminals.add(terminal_id)
 
     async def run_streaming_command(
@@ -239,8 +239,7 @@ class WebSocketManager:
                 )
             
             # Cleanup
-            if terminal_id in self.terminals:
-                del self.terminals[terminal_id]
+            self.terminals.pop(terminal_id, None)
             
             if on_complete:
                 on_complete(exit_code)
@@ -254,41 +253,41 @@ class WebSocketManager:
 
     async def send_terminal_input(self, terminal_id: str, input_text: str):
         """Send input to a running terminal."""
-        if terminal_id not in self.terminals:
+        process = self.terminals.get(terminal_id)
+        if process is None:
             return False
         
-        process = self.terminals[terminal_id]
         if process.stdin:
             process.stdin.write(input_text.encode())
             await process.stdin.drain()
             return True
         return False
 
-    async def kill_terminal(self, terminal_id: str):
+    def kill_terminal(self, terminal_id: str):
         """Kill a running terminal process."""
-        if terminal_id not in self.terminals:
+        process = self.terminals.get(terminal_id)
+        if process is None:
             return False
         
-        process = self.terminals[terminal_id]
         process.terminate()
         return True
 
     def register_session_task(self, session_id: str, task: asyncio.Task):
         """Register a running agent task for a session."""
+        self._running_agent_tasks.add(task)
+        task.add_done_callback(self._running_agent_tasks.discard)
         self.active_agent_tasks[session_id] = task
 
     def unregister_session_task(self, session_id: str):
         """Unregister a completed task."""
-        if session_id in self.active_agent_tasks:
-            del self.active_agent_tasks[session_id]
+        self.active_agent_tasks.pop(session_id, None)
 
     def cancel_session_task(self, session_id: str):
         """Cancel the running task for a session."""
-        if session_id in self.active_agent_tasks:
-            task = self.active_agent_tasks[session_id]
-            if not task.done():
-                task.cancel()
-                return True
+        task = self.active_agent_tasks.get(session_id)
+        if task is not None and not task.done():
+            task.cancel()
+            return True
         return False
 
 
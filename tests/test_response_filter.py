@@ -0,0 +1,46 @@
+import pytest
+
+from backend.response_filter import ThoughtFilter
+
+
+def _stream(text, chunk_size):
+    parser = ThoughtFilter().stream_parser()
+    for i in range(0, len(text), chunk_size):
+        parser.feed(text[i:i + chunk_size])
+    parser.finish()
+    return parser.result()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Hello <think>plan</think> world", ("plan", "Hello  world")),
+    ("Hi <THINK>x</Think> there", ("x", "Hi  there")),
+    ("a [Thinking]b[/THINKING] c", ("b", "a  c")),
+    ("İİ <think>abc</think> world", ("abc", "İİ  world")),
+    ("ß <Internal>ü</internal> done", ("ü", "ß  done")),
+    ("a <think>unterminated", ("unterminated", "a")),
+    ("a <think>x</think> b [THINKING]cut off</thi", ("x\n\ncut off</thi", "a  b")),
+    ("<think> </think>hi", (None, "hi")),
+    ("no tags at all <thi", (None, "no tags at all <thi")),
+])
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 1000])
+def test_stream_parser_matches_extract_thoughts(text, expected, chunk_size):
+    assert ThoughtFilter().extract_thoughts(text) == expected
+    assert _stream(text, chunk_size) == expected
+
+
+def test_stream_parser_splits_tags_across_chunks():
+    parser = ThoughtFilter().stream_parser()
+    deltas = [parser.feed(chunk) for chunk in ("before <th", "INK>ins", "ide</thi", "nk> after")]
+    deltas.append(parser.finish())
+
+    assert "".join(thought for thought, _ in deltas) == "inside"
+    assert "".join(text for _, text in deltas) == "before  after"
+
+
+def test_unterminated_block_reaches_the_client_once():
+    parser = ThoughtFilter().stream_parser()
+    deltas = [parser.feed("hello <think>abc "), parser.feed("def more"), parser.finish()]
+
+    assert "".join(thought for thought, _ in deltas) == "abc def more"
+    assert "".join(text for _, text in deltas) == "hello "
+    assert parser.result() == ("abc def more", "hello")